@@ -1,12 +1,24 @@
 import streamlit as st
-import joblib
 import pandas as pd
-import time
-import googlemaps
 import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
-import pyrebase
+import uuid
+
+from appointment_watch import AppointmentWatchRegistry
+from clinic_index import sync_registered_in_background
+from maps_gateway import MapsGateway
+from appointments import (STATUSES, count_by_status, count_in_memory, fetch_page, fetch_patient_appointments,
+                          page_in_memory, set_status_bulk)
+from inference import (DIFFERENTIAL_MIN_PROBABILITY, DIFFERENTIAL_SIZE, FLAT_MODEL_PATH, MODEL_PATH, SPECIALISTS,
+                       SymptomPredictor, check_manifest, get_specialist, load_manifest, load_specialists, read_symptoms)
+from places import DETAIL_FIELDS, fetch_place_details, search_specialists
+from roles import resolve_role
+from search_cache import CachedMapsClient
+from search_results import SearchResults, results_key
+from slots import SLOTS, SlotTaken, book_slot, free_slots, release_slots
+from services import get_auth, get_clinic_index, get_db, get_gmaps, get_location_resolver
+import inference
+import tracing
+from ttl_cache import TTLCache
 
 # --- 1. Page Configuration (MUST be the first command) ---
 st.set_page_config(
@@ -16,47 +28,26 @@ st.set_page_config(
 )
 
 # --- 2. Initialize APIs ---
-
-# Initialize Google Maps Client
-try:
-    gmaps = googlemaps.Client(key=st.secrets["GOOGLE_API_KEY"])
-except Exception as e:
-    st.error(f"Could not initialize Google Maps: {e}. Check your API key.")
-    gmaps = None
-
-# Initialize Firebase Admin (for database)
-try:
-    # Check if app is already initialized
-    if not firebase_admin._apps:
-        # Use the secrets to create a credentials dictionary
-        cred_dict = dict(st.secrets["firebase_service_account"])
-        cred = credentials.Certificate(cred_dict)
-        firebase_admin.initialize_app(cred)
-
-    db = firestore.client()
-    print("Firestore client initialized.")
-except Exception as e:
-    st.error(f"Could not initialize Firestore Admin: {e}. Check your service_account keys.")
-    db = None
-
-# Initialize Pyrebase (for auth)
-try:
-    firebase_config = dict(st.secrets["firebase_config"])
-    firebase = pyrebase.initialize_app(firebase_config)
-    auth = firebase.auth()
-    print("Firebase Auth initialized.")
-except Exception as e:
-    st.error(f"Could not initialize Firebase Auth: {e}. Check your firebase_config keys.")
-    auth = None
+# Maps, Firestore and Auth clients are created on first use by get_gmaps(), get_db() and
+# get_auth() (see services.py), so the login page renders without waiting for them.
 
 
 # --- 3. Caching ---
+@st.cache_resource
+def setup_tracing():
+    """Turns on per-request tracing when the optional [tracing] secrets section enables it."""
+    config = dict(st.secrets.get("tracing", {}))
+    tracing.configure(enabled=config.get("enabled", False),
+                      path=config.get("file", "traces/traces.jsonl"),
+                      format=config.get("format", "jsonl"))
+    return config
+
+
 @st.cache_resource
 def load_model():
-    """Loads the saved machine learning model."""
+    """Loads the saved machine learning model, preferring its memory-mapped export."""
     try:
-        model = joblib.load('model/disease_predictor_model.pkl')
-        return model
+        return inference.load_model(MODEL_PATH, FLAT_MODEL_PATH)
     except FileNotFoundError:
         st.error("Error: Model file not found. Make sure 'disease_predictor_model.pkl' is in the 'model' folder.")
         return None
@@ -65,24 +56,100 @@ def load_model():
         return None
 
 
+@st.cache_resource
+def get_place_details_cache():
+    """Process-wide cache of place details, shared by every session."""
+    return TTLCache(maxsize=2048, ttl=60 * 60)
+
+
+@st.cache_resource
+def get_search_results_cache():
+    """Recent search results, shared by every session that runs the same search."""
+    return TTLCache(maxsize=512, ttl=10 * 60)
+
+
 @st.cache_data
 def get_symptoms_list():
-    """Loads the list of symptoms from the Training.csv file."""
+    """Loads the list of symptoms from the manifest shipped with the model."""
     try:
-        data = pd.read_csv('Training.csv')
-        all_cols = data.columns.tolist()
-        symptoms = [col for col in all_cols if col != 'prognosis' and not col.startswith('Unnamed:')]
-        return symptoms
+        return load_manifest()
     except FileNotFoundError:
-        st.error("Error: 'Training.csv' not found. Make sure it's in the main project folder.")
-        return []
+        # No manifest yet: fall back to the header of Training.csv
+        try:
+            return read_symptoms()
+        except FileNotFoundError:
+            st.error("Error: Neither 'model/symptom_manifest.json' nor 'Training.csv' was found.")
+            return []
     except Exception as e:
         st.error(f"An error occurred while loading symptoms: {e}")
         return []
 
 
+@st.cache_data
+def get_specialists_table():
+    """Loads the condition -> specialist table shipped with the model, or None if there is none."""
+    try:
+        return load_specialists()
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource
+def get_predictor():
+    """Loads the model on first use and wraps it in a shared predictor that memoizes predictions."""
+    model = load_model()
+    symptoms = get_symptoms_list()
+    if model is None or not symptoms:
+        return None
+    mismatch = check_manifest(model, symptoms)
+    if mismatch:
+        st.error(f"The symptom manifest does not match the model: {mismatch}")
+        return None
+    return SymptomPredictor(model, symptoms)
+
+
+@st.cache_resource
+def get_role_cache():
+    """Process-wide cache of each user's role and doctor profile, keyed by localId."""
+    return TTLCache(maxsize=10_000)
+
+
+@st.cache_resource
+def index_registered_clinics(_clinic_index, _db, _gmaps):
+    """Adds the clinics of already registered doctors to the clinic index, once per process."""
+    return sync_registered_in_background(_clinic_index, _db, _gmaps)
+
+
+@st.cache_resource
+def get_appointment_watches():
+    """Real-time appointment listeners, shared by every doctor session in the process."""
+    return AppointmentWatchRegistry(idle_timeout=5 * 60)
+
+
+def shared_cache_stats():
+    """Counters of the process-wide caches, for the tracing debug panel."""
+    stats = {
+        "Role cache": get_role_cache().stats(),
+        "Location cache": get_location_resolver().stats(),
+        "Search results cache": get_search_results_cache().stats(),
+        "Place details cache": get_place_details_cache().stats(),
+    }
+    clinic_index = get_clinic_index()
+    if clinic_index is not None:
+        stats["Clinic index"] = clinic_index.stats()
+    # The Maps client is a CachedMapsClient around a MapsGateway (see services.py)
+    gmaps = get_gmaps()
+    if isinstance(gmaps, CachedMapsClient):
+        stats["Text search cache"] = gmaps.stats()
+        gmaps = gmaps.client
+    if isinstance(gmaps, MapsGateway):
+        stats["Maps gateway"] = gmaps.stats()
+    return stats
+
+
 # --- 4. Load resources ---
-model = load_model()
+tracing_config = setup_tracing()
+# Only the (small) symptom manifest is read up front; the model loads with the patient dashboard.
 symptoms = get_symptoms_list()
 
 # --- 5. Session State Initialization ---
@@ -95,34 +162,295 @@ if 'doctor_profile' not in st.session_state:
     st.session_state.doctor_profile = None
 
 # App-specific state
-if "booking_confirmation" not in st.session_state:
-    st.session_state.booking_confirmation = None
 if "prediction" not in st.session_state:
     st.session_state.prediction = None
 if "specialist" not in st.session_state:
     st.session_state.specialist = None
-if "doctors_list" not in st.session_state:
-    st.session_state.doctors_list = []
-if "map_data_list" not in st.session_state:
-    st.session_state.map_data_list = []
+if "differential" not in st.session_state:
+    st.session_state.differential = None
+if "specialists" not in st.session_state:
+    st.session_state.specialists = None
+# A SearchResults, shared with other sessions through get_search_results_cache()
+if "search_results" not in st.session_state:
+    st.session_state.search_results = None
+# The patient's appointments as last read; None until "My Appointments" is opened
+if "my_appointments" not in st.session_state:
+    st.session_state.my_appointments = None
+
+if "last_trace" not in st.session_state:
+    st.session_state.last_trace = None
+if "bulk_report" not in st.session_state:
+    st.session_state.bulk_report = None
+
+# Identifies this session's lease on shared appointment listeners
+if not st.session_state.get("session_id"):
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Doctor dashboard paging state
+if "appointment_filters" not in st.session_state:
+    st.session_state.appointment_filters = None
+if "appointment_cursors" not in st.session_state:
+    st.session_state.appointment_cursors = [None]
 
 
 # --- 6. Helper Function to Check User Role ---
 def check_user_role(user_id):
-    """Checks the 'doctors' collection in Firestore to determine user role."""
+    """Determines the user's role from the 'doctors' collection, via the shared role cache."""
+    db = get_db()
     if db:
-        doc_ref = db.collection("doctors").document(user_id)
-        profile = doc_ref.get()
-        if profile.exists:
-            st.session_state.doctor_profile = profile.to_dict()
+        role, profile = resolve_role(db, user_id, get_role_cache())
+        if role == "doctor":
+            st.session_state.doctor_profile = dict(profile)
             return "doctor"
     return "patient"
 
 
-# --- 7. Main App Logic ---
+def keep_trace(request_trace):
+    """Keeps a request's breakdown for the debug panel; call it before `st.rerun()` ends the request."""
+    if request_trace:
+        st.session_state.last_trace = request_trace.summary()
+
+
+def change_appointment_statuses(db, watch, appt_ids, status):
+    """Sets `status` on several appointments with batched writes.
+
+    With a live in-memory copy (`watch`), the change is shown immediately and rolled
+    back if the writes fail. The outcome is left in `st.session_state.bulk_report`.
+    """
+    with tracing.trace("update_status", appointments=len(appt_ids)) as request_trace:
+        previous = watch.apply_local({appt_id: {"status": status} for appt_id in appt_ids}) if watch else {}
+        # Only pending appointments can be selected; the live copy knows better when there is one
+        previous_statuses = {appt_id: "Pending" for appt_id in appt_ids}
+        previous_statuses.update({appt_id: fields["status"] for appt_id, fields in previous.items()
+                                  if fields["status"]})
+        try:
+            with tracing.span("write_statuses"):
+                writes, commits, elapsed = set_status_bulk(db, appt_ids, status, previous=previous_statuses)
+            st.session_state.bulk_report = \
+                f"✅ {status} {writes} appointment(s): {writes} writes in {commits} batch(es), {elapsed * 1000:.0f} ms."
+        except Exception as e:
+            if watch:
+                watch.apply_local(previous)
+            st.session_state.bulk_report = f"❌ Error: Could not update appointments. {e}"
+        else:
+            if status == "Declined":
+                # Declined appointments give their slots back
+                try:
+                    with tracing.span("release_slots"):
+                        st.session_state.bulk_report += f" {release_slots(db, appt_ids)} slot(s) freed."
+                except Exception as e:
+                    st.session_state.bulk_report += f" Their slots could not be freed: {e}"
+    keep_trace(request_trace)
+    # Clear the selection
+    for key in ["select_all_pending"] + [f"select_{appt_id}" for appt_id in appt_ids]:
+        st.session_state.pop(key, None)
+
+
+@st.fragment(run_every=2)
+def rerun_on_appointment_change(place_id, session_id, watch, rendered_version):
+    """Polls the in-memory appointments and reruns the page only when they have changed.
+
+    Each poll also renews the session's lease on the listener, so an open dashboard keeps
+    it alive; if it was closed anyway, the rerun acquires a new one.
+    """
+    if get_appointment_watches().touch(place_id, session_id) is not watch or watch.version != rendered_version:
+        st.rerun()
+
+
+FIND_DOCTOR_TAB = "Find a Doctor 🔍"
+MY_APPOINTMENTS_TAB = "My Appointments 🗓️"
+
+
+def on_patient_tab_change():
+    # Opening "My Appointments" reads the latest statuses; it is not read while closed
+    if st.session_state.patient_tab == MY_APPOINTMENTS_TAB:
+        st.session_state.my_appointments = None
+
+
+def request_appointment(place_id, name):
+    """Submit callback of a booking form: claims the chosen slot and leaves a message for the popover."""
+    patient_name = st.session_state[f"name_{place_id}"]
+    appt_date = st.session_state[f"date_{place_id}"]
+    slot = st.session_state[f"slot_{place_id}"]
+    message_key = f"booking_message_{place_id}"
+    if not patient_name:
+        st.session_state[message_key] = ("warning", "Please enter your name.")
+        return
+    with tracing.trace("book_appointment") as request_trace:
+        try:
+            with tracing.span("book_slot"):
+                book_slot(get_db(), place_id, appt_date, slot, {
+                    "patient_email": st.session_state.user['email'],
+                    "patient_id": st.session_state.user['localId'],
+                    "patient_name": patient_name,
+                    "doctor_name": name,
+                    "status": "Pending"
+                })
+        except SlotTaken as e:
+            st.session_state[message_key] = ("warning", f"{e} Please pick another time.")
+        except Exception as e:
+            st.session_state[message_key] = ("error", f"❌ Error: Could not book appointment. {e}")
+        else:
+            # The appointments list is read again the next time it is shown
+            st.session_state.my_appointments = None
+            st.session_state[message_key] = (
+                "success", f"✅ Success! Your appointment request for {name} at {slot} on {appt_date} has been sent.")
+    keep_trace(request_trace)
+
+
+@st.fragment
+def booking_popover(place_id, name):
+    """Booking form of one doctor card; opening it, picking a date or submitting reruns only this popover.
+
+    The free slots of the chosen day are read (one document) only while the popover is open.
+    """
+    popover = st.popover("Book Appointment", use_container_width=True, key=f"book_{place_id}", on_change="rerun")
+    with popover:
+        if not popover.open:
+            return
+        st.markdown(f"**Book with {name}**")
+        message = st.session_state.pop(f"booking_message_{place_id}", None)
+        if message:
+            kind, text = message
+            getattr(st, kind)(text)
+            if kind == "success":
+                st.toast(f"Appointment requested with {name}", icon="✅")
+        today = datetime.date.today()
+        # Start from tomorrow once today's last slot has passed
+        first_day = today if datetime.datetime.now().strftime("%H:%M") < SLOTS[-1] else \
+            today + datetime.timedelta(days=1)
+        appt_date = st.date_input("Preferred Date", value=first_day, min_value=today, key=f"date_{place_id}")
+        db = get_db()
+        if not db:
+            st.error("Database client could not be initialized. Cannot book appointments.")
+            return
+        try:
+            open_slots = free_slots(db, place_id, appt_date)
+        except Exception as e:
+            st.error(f"❌ Error: Could not load free times. {e}")
+            return
+        if not open_slots:
+            st.warning("No free times on this day. Please pick another date.")
+            return
+
+        with st.form(key=f"book_form_{place_id}", clear_on_submit=True):
+            st.text_input("Your Full Name", key=f"name_{place_id}")
+            st.selectbox(f"Free times ({len(open_slots)} of {len(SLOTS)})", open_slots, key=f"slot_{place_id}")
+            st.form_submit_button("Request Appointment", on_click=request_appointment, args=(place_id, name))
+
+
+def render_doctor_card(doctor, specialists):
+    """One doctor card of the results panel, from its `DoctorResult`."""
+    place_id = doctor.place_id
+    name = doctor.name
+    website = doctor.website
+
+    open_now = "Status unknown"
+    if doctor.open_now is not None:
+        open_now = "🟢 Open now" if doctor.open_now else "🔴 Closed"
+
+    with st.container(border=True):
+        st.markdown(f"#### {name}")
+        if len(specialists) > 1:
+            st.caption("🩺 " + ", ".join(doctor.specialties))
+        st.write(f"**{doctor.rating}** ⭐ | {open_now}")
+        st.write(f"📍 **Address:** {doctor.address}")
+        st.write(f"📞 **Phone:** {doctor.phone}")
+
+        col_btn1, col_btn2, col_btn3 = st.columns(3)
+
+        with col_btn1:
+            if website:
+                st.link_button("Visit Website 🌐", url=website, use_container_width=True)
+            else:
+                st.button("Website N/A", disabled=True, use_container_width=True, key=f"web_na_{place_id}")
+        with col_btn2:
+            gmaps_url = f"https://www.google.com/maps/search/?api=1&query={name.replace(' ', '+')}&query_place_id={place_id}"
+            st.link_button("View on Map 🗺️", url=gmaps_url, use_container_width=True)
+
+        with col_btn3:
+            booking_popover(place_id, name)
+
+    st.write("")
 
-# Check if all services are initialized
-services_ready = model and symptoms and gmaps and db and auth
+
+@st.fragment
+def render_recommendations():
+    """The results panel: predicted conditions, doctor cards and map, from session state. Reruns on its own."""
+    if not st.session_state.prediction:
+        st.info("Your results will appear here.")
+        return
+
+    if st.session_state.differential and len(st.session_state.differential) > 1:
+        st.success("**Likely Conditions:** " + ", ".join(
+            f"{condition} ({probability:.0%})" for condition, probability in st.session_state.differential))
+    else:
+        st.success(f"**Predicted Condition:** {st.session_state.prediction}")
+    specialists = st.session_state.specialists or [st.session_state.specialist]
+    if len(specialists) > 1:
+        st.markdown("### Recommended Specialists: " + ", ".join(f"**{specialist}**" for specialist in specialists))
+        st.divider()
+        st.subheader("Top doctors near you:")
+    else:
+        st.markdown(f"### Recommended Specialist: **{st.session_state.specialist}**")
+        st.divider()
+        st.subheader(f"Top 5 {st.session_state.specialist}s near you:")
+
+    results = st.session_state.search_results
+    if not results:
+        st.warning("No doctors found matching your criteria.")
+    else:
+        for doctor in results.doctors:
+            render_doctor_card(doctor, specialists)
+
+    if results and results.map_data is not None:
+        st.divider()
+        st.subheader("Doctor Locations:")
+        st.map(results.map_data, latitude='lat', longitude='lon', size=10, zoom=12)
+
+
+@st.fragment
+def patient_appointments(db, user_id):
+    """The patient's appointment list; reads Firestore only when the session has no copy or on Refresh."""
+    if st.button("🔄 Refresh", key="refresh_appointments"):
+        st.session_state.my_appointments = None
+    try:
+        if st.session_state.my_appointments is None:
+            st.session_state.my_appointments = fetch_patient_appointments(db, user_id)
+        appointments = st.session_state.my_appointments
+
+        if not appointments:
+            st.warning(f"You have no appointments. Find a doctor to get started!")
+        else:
+            st.success(f"Found {len(appointments)} appointments:")
+
+            col1, col2, col3, col4 = st.columns([3, 2, 2, 1.5])
+            col1.write("**Doctor**")
+            col2.write("**Date**")
+            col3.write("**Time**")
+            col4.write("**Status**")
+            st.divider()
+
+            for appt_data in appointments:
+                col1, col2, col3, col4 = st.columns([3, 2, 2, 1.5])
+
+                col1.write(appt_data.get("doctor_name"))
+                col2.write(appt_data.get("appointment_date"))
+                col3.write(appt_data.get("appointment_time"))
+
+                status = appt_data.get("status", "Pending")
+                if status == "Pending":
+                    col4.warning(status)
+                elif status == "Accepted":
+                    col4.success(status)
+                elif status == "Declined":
+                    col4.error(status)
+
+    except Exception as e:
+        st.error(f"An error occurred while fetching appointments: {e}")
+
+
+# --- 7. Main App Logic ---
 
 # If user is not logged in, show login/signup page
 if st.session_state.user is None:
@@ -130,92 +458,96 @@ if st.session_state.user is None:
     st.title("Welcome to Health Navigator 🩺")
     st.markdown("Please log in or sign up to continue.")
 
-    if not services_ready:
-        st.error("A core service (Model, Auth, or Database) failed to load. Please check server logs.")
-    else:
-        login_tab, patient_signup_tab, doctor_signup_tab = st.tabs(["Login", "Patient Signup", "Doctor Signup"])
+    login_tab, patient_signup_tab, doctor_signup_tab = st.tabs(["Login", "Patient Signup", "Doctor Signup"])
 
-        # --- Login Tab ---
-        with login_tab:
-            with st.form("login_form"):
-                email = st.text_input("Email")
-                password = st.text_input("Password", type="password")
-                login_button = st.form_submit_button("Login")
+    # --- Login Tab ---
+    with login_tab:
+        with st.form("login_form"):
+            email = st.text_input("Email")
+            password = st.text_input("Password", type="password")
+            login_button = st.form_submit_button("Login")
 
-                if login_button:
+            auth = get_auth() if login_button else None
+            if auth:
+                try:
+                    user = auth.sign_in_with_email_and_password(email, password)
+                    st.session_state.user = user  # Save user info in state
+                    st.session_state.user_role = check_user_role(user['localId'])  # Check and save role
+                    st.rerun()  # Rerun the app
+                except Exception as e:
+                    st.error(f"Login failed: Invalid email or password.")
+
+    # --- Patient Sign Up Tab ---
+    with patient_signup_tab:
+        with st.form("patient_signup_form"):
+            st.markdown("Create a new patient account.")
+            email = st.text_input("Email")
+            password = st.text_input("Password", type="password")
+            confirm_password = st.text_input("Confirm Password", type="password")
+            signup_button = st.form_submit_button("Create Patient Account")
+
+            if signup_button:
+                if not email or not password or not confirm_password:
+                    st.warning("Please fill out all fields.")
+                elif password != confirm_password:
+                    st.error("Passwords do not match.")
+                elif auth := get_auth():
                     try:
-                        user = auth.sign_in_with_email_and_password(email, password)
-                        st.session_state.user = user  # Save user info in state
-                        st.session_state.user_role = check_user_role(user['localId'])  # Check and save role
-                        st.rerun()  # Rerun the app
+                        user = auth.create_user_with_email_and_password(email, password)
+                        st.success("Patient account created successfully! Please log in.")
                     except Exception as e:
-                        st.error(f"Login failed: Invalid email or password.")
-
-        # --- Patient Sign Up Tab ---
-        with patient_signup_tab:
-            with st.form("patient_signup_form"):
-                st.markdown("Create a new patient account.")
-                email = st.text_input("Email")
-                password = st.text_input("Password", type="password")
-                confirm_password = st.text_input("Confirm Password", type="password")
-                signup_button = st.form_submit_button("Create Patient Account")
-
-                if signup_button:
-                    if not email or not password or not confirm_password:
-                        st.warning("Please fill out all fields.")
-                    elif password != confirm_password:
-                        st.error("Passwords do not match.")
-                    else:
-                        try:
+                        st.error(f"Sign up failed. This email may already be in use.")
+
+    # --- Doctor Sign Up Tab ---
+    with doctor_signup_tab:
+        with st.form("doctor_signup_form"):
+            st.markdown("Create a new doctor profile.")
+            email = st.text_input("Your Email")
+            password = st.text_input("Password", type="password")
+            st.divider()
+            st.markdown("Enter your clinic's **exact** name and location to link your profile.")
+            clinic_name = st.text_input("Your Clinic's Name (e.g., 'Medanta, Lucknow')")
+            clinic_location = st.text_input("City/Area (e.g., 'Lucknow')")
+            clinic_specialty = st.selectbox("Your Specialty", SPECIALISTS)
+            signup_button = st.form_submit_button("Create Doctor Account")
+
+            if signup_button:
+                if not email or not password or not clinic_name or not clinic_location:
+                    st.warning("Please fill out all fields.")
+                elif (auth := get_auth()) and (gmaps := get_gmaps()) and (db := get_db()):
+                    try:
+                        with st.spinner("Creating your user account..."):
                             user = auth.create_user_with_email_and_password(email, password)
-                            st.success("Patient account created successfully! Please log in.")
-                        except Exception as e:
-                            st.error(f"Sign up failed. This email may already be in use.")
-
-        # --- Doctor Sign Up Tab ---
-        with doctor_signup_tab:
-            with st.form("doctor_signup_form"):
-                st.markdown("Create a new doctor profile.")
-                email = st.text_input("Your Email")
-                password = st.text_input("Password", type="password")
-                st.divider()
-                st.markdown("Enter your clinic's **exact** name and location to link your profile.")
-                clinic_name = st.text_input("Your Clinic's Name (e.g., 'Medanta, Lucknow')")
-                clinic_location = st.text_input("City/Area (e.g., 'Lucknow')")
-                signup_button = st.form_submit_button("Create Doctor Account")
-
-                if signup_button:
-                    if not email or not password or not clinic_name or not clinic_location:
-                        st.warning("Please fill out all fields.")
-                    else:
-                        try:
-                            with st.spinner("Creating your user account..."):
-                                user = auth.create_user_with_email_and_password(email, password)
-                                user_id = user['localId']
-
-                            with st.spinner(f"Finding {clinic_name} in {clinic_location}..."):
-                                query = f"{clinic_name} {clinic_location}"
-                                places_result = gmaps.places(query=query)
-                                if not places_result.get('results'):
-                                    st.error(f"Error: Could not find a clinic matching '{query}'.")
-                                    auth.delete_user_account(user['idToken'])
-                                    st.stop()
-
-                                top_result = places_result['results'][0]
-                                found_name = top_result['name']
-                                found_address = top_result['formatted_address']
-                                found_place_id = top_result['place_id']
-
-                            with st.spinner(f"Saving your profile..."):
-                                profile_data = {
-                                    "email": email, "clinic_name": found_name,
-                                    "address": found_address, "place_id": found_place_id
-                                }
-                                db.collection("doctors").document(user_id).set(profile_data)
-                            st.success(f"Success! Your profile for '{found_name}' is created. Please log in.")
-
-                        except Exception as e:
-                            st.error(f"Sign up failed: {e}")
+                            user_id = user['localId']
+
+                        with st.spinner(f"Finding {clinic_name} in {clinic_location}..."):
+                            query = f"{clinic_name} {clinic_location}"
+                            places_result = gmaps.places(query=query)
+                            if not places_result.get('results'):
+                                st.error(f"Error: Could not find a clinic matching '{query}'.")
+                                auth.delete_user_account(user['idToken'])
+                                st.stop()
+
+                            top_result = places_result['results'][0]
+                            found_name = top_result['name']
+                            found_address = top_result['formatted_address']
+                            found_place_id = top_result['place_id']
+
+                        with st.spinner(f"Saving your profile..."):
+                            profile_data = {
+                                "email": email, "clinic_name": found_name,
+                                "address": found_address, "place_id": found_place_id,
+                                "specialty": clinic_specialty
+                            }
+                            db.collection("doctors").document(user_id).set(profile_data)
+                            get_role_cache().invalidate(user_id)  # Forget any cached "patient" role
+                            # Make the clinic findable by nearby searches right away
+                            if (clinic_index := get_clinic_index()) is not None:
+                                clinic_index.add(top_result, clinic_specialty, registered=True)
+                        st.success(f"Success! Your profile for '{found_name}' is created. Please log in.")
+
+                    except Exception as e:
+                        st.error(f"Sign up failed: {e}")
 
 # If user IS logged in, show the correct dashboard
 else:
@@ -225,12 +557,27 @@ else:
         st.markdown(f"Logged in as: **{user_email}**")
 
         if st.button("Logout"):
+            if st.session_state.doctor_profile:
+                get_appointment_watches().release(st.session_state.doctor_profile['place_id'],
+                                                  st.session_state.session_id)
             # Clear all session state on logout
             for key in st.session_state.keys():
                 if key != 'db' and key != 'gmaps':  # Keep services initialized
                     st.session_state[key] = None
             st.rerun()
 
+        if tracing_config.get("debug_panel"):
+            last_trace = st.session_state.last_trace
+            if last_trace:
+                with st.expander(f"⏱️ Last request: {last_trace['trace']} ({last_trace['duration_ms']:.0f} ms)"):
+                    st.dataframe(pd.DataFrame(last_trace['spans']), hide_index=True, use_container_width=True)
+                    st.write("**External calls**")
+                    st.json(last_trace['counters'])
+            with st.expander("📊 Shared caches"):
+                for name, stats in shared_cache_stats().items():
+                    st.write(f"**{name}**")
+                    st.json(stats)
+
         st.divider()
         st.title("About")
         st.info("This app predicts conditions and recommends local specialists.")
@@ -244,81 +591,164 @@ else:
     if st.session_state.user_role == "doctor":
         st.title("🧑‍⚕️ Doctor's Appointment Dashboard")
 
+        db = get_db()
         if not db:
             st.error("Database client is not initialized.")
         else:
-            try:
-                # Load profile if it's not in state
-                if st.session_state.doctor_profile is None:
-                    st.session_state.user_role = check_user_role(st.session_state.user['localId'])
-
-                profile = st.session_state.doctor_profile
-                st.subheader(f"Managing Appointments for: **{profile['clinic_name']}**")
-                st.caption(f"📍 {profile['address']}")
-
-                place_id = profile['place_id']
+            with tracing.trace("doctor_dashboard") as request_trace:
+                try:
+                    # Load profile if it's not in state
+                    if st.session_state.doctor_profile is None:
+                        with tracing.span("role_lookup"):
+                            st.session_state.user_role = check_user_role(st.session_state.user['localId'])
 
-                appointments_ref = db.collection("appointments") \
-                    .where("doctor_place_id", "==", place_id) \
-                    .stream()
+                    profile = st.session_state.doctor_profile
+                    st.subheader(f"Managing Appointments for: **{profile['clinic_name']}**")
+                    st.caption(f"📍 {profile['address']}")
 
-                appointments = list(appointments_ref)
+                    place_id = profile['place_id']
 
-                if not appointments:
-                    st.warning("You have no pending appointments.")
-                else:
                     st.divider()
                     st.subheader("Manage Appointments")
 
-                    col1, col2, col3, col4, col5 = st.columns([2, 2, 3, 2, 3])
-                    col1.write("**Date**")
-                    col2.write("**Time**")
-                    col3.write("**Patient Name**")
-                    col4.write("**Status**")
-                    col5.write("**Actions**")
-                    st.divider()
+                    # Filtering, ordering and paging all happen in Firestore; only one page is read
+                    filter_col1, filter_col2, filter_col3 = st.columns([2, 3, 2])
+                    status_filter = filter_col1.selectbox("Status", ["All"] + STATUSES)
+                    date_range = filter_col2.date_input("Date range", value=(), format="YYYY-MM-DD")
+                    order = filter_col3.selectbox("Order", ["Newest first", "Oldest first"])
+                    status_filter = None if status_filter == "All" else status_filter
+                    start_date = date_range[0] if len(date_range) > 0 else None
+                    end_date = date_range[1] if len(date_range) > 1 else None
+
+                    # Serve from the clinic's live in-memory copy when real-time updates are on,
+                    # otherwise query Firestore for just this page
+                    watch = None
+                    if st.secrets.get("realtime_appointments", True):
+                        with tracing.span("listener_acquire"):
+                            watch = get_appointment_watches().acquire(db, place_id, st.session_state.session_id)
+                            if watch is not None and not watch.wait_until_ready():
+                                get_appointment_watches().fail(place_id, watch)
+                                watch = None
+                    with tracing.span("status_counts"):
+                        if watch:
+                            version, cached_appointments = watch.appointments()
+                            rerun_on_appointment_change(place_id, st.session_state.session_id, watch, version)
+                            counts = count_in_memory(cached_appointments, start_date, end_date)
+                        else:
+                            counts = count_by_status(db, place_id, start_date, end_date)
+                    for count_col, count_status in zip(st.columns(len(STATUSES)), STATUSES):
+                        count_col.metric(count_status, counts[count_status])
+
+                    # Stack of page cursors; start over from page 1 whenever the filters change
+                    filters = (status_filter, start_date, end_date, order)
+                    if st.session_state.appointment_filters != filters:
+                        st.session_state.appointment_filters = filters
+                        st.session_state.appointment_cursors = [None]
+
+                    page_args = dict(status=status_filter, start_date=start_date, end_date=end_date,
+                                     newest_first=order == "Newest first",
+                                     cursor=st.session_state.appointment_cursors[-1])
+                    with tracing.span("appointments_page"):
+                        if watch:
+                            appointments, has_more = page_in_memory(cached_appointments, **page_args)
+                        else:
+                            appointments, has_more = fetch_page(db, place_id, **page_args)
+
+                    if st.session_state.bulk_report:
+                        st.info(st.session_state.bulk_report)
+                        st.session_state.bulk_report = None
+
+                    with tracing.span("render"):
+                        if not appointments:
+                            st.warning("No appointments match these filters.")
+                        else:
+                            # Bulk actions on the pending appointments ticked below (or the whole page)
+                            pending_ids = [appt.id for appt in appointments
+                                           if appt.to_dict().get("status", "Pending") == "Pending"]
+                            bulk_col1, bulk_col2, bulk_col3 = st.columns([3, 2, 2])
+                            select_all = bulk_col1.checkbox("Select all pending on this page", key="select_all_pending",
+                                                           disabled=not pending_ids)
+                            selected_ids = pending_ids if select_all else \
+                                [appt_id for appt_id in pending_ids if st.session_state.get(f"select_{appt_id}")]
+                            bulk_status = None
+                            if bulk_col2.button(f"Accept selected ({len(selected_ids)})", disabled=not selected_ids,
+                                                use_container_width=True):
+                                bulk_status = "Accepted"
+                            if bulk_col3.button(f"Decline selected ({len(selected_ids)})", disabled=not selected_ids,
+                                                use_container_width=True):
+                                bulk_status = "Declined"
+                            if bulk_status:
+                                change_appointment_statuses(db, watch, selected_ids, bulk_status)
+                                st.rerun()
 
-                    for appt in appointments:
-                        appt_id = appt.id
-                        appt_data = appt.to_dict()
+                            col0, col1, col2, col3, col4, col5 = st.columns([0.5, 2, 2, 3, 2, 3])
+                            col1.write("**Date**")
+                            col2.write("**Time**")
+                            col3.write("**Patient Name**")
+                            col4.write("**Status**")
+                            col5.write("**Actions**")
+                            st.divider()
 
-                        col1, col2, col3, col4, col5 = st.columns([2, 2, 3, 2, 3])
+                            for appt in appointments:
+                                appt_id = appt.id
+                                appt_data = appt.to_dict()
 
-                        col1.write(appt_data.get("appointment_date"))
-                        col2.write(appt_data.get("appointment_time"))
-                        col3.write(appt_data.get("patient_name"))
+                                col0, col1, col2, col3, col4, col5 = st.columns([0.5, 2, 2, 3, 2, 3])
 
-                        status = appt_data.get("status", "Pending")
-                        if status == "Pending":
-                            col4.warning(status)
-                        elif status == "Accepted":
-                            col4.success(status)
-                        elif status == "Declined":
-                            col4.error(status)
+                                if appt_id in pending_ids:
+                                    col0.checkbox("Select", key=f"select_{appt_id}", label_visibility="collapsed")
+                                col1.write(appt_data.get("appointment_date"))
+                                col2.write(appt_data.get("appointment_time"))
+                                col3.write(appt_data.get("patient_name"))
 
-                        btn_col1, btn_col2 = col5.columns(2)
+                                status = appt_data.get("status", "Pending")
+                                if status == "Pending":
+                                    col4.warning(status)
+                                elif status == "Accepted":
+                                    col4.success(status)
+                                elif status == "Declined":
+                                    col4.error(status)
 
-                        if status == "Pending":  # Only show buttons if pending
-                            if btn_col1.button("Accept", key=f"accept_{appt_id}", use_container_width=True):
-                                db.collection("appointments").document(appt_id).update({"status": "Accepted"})
-                                st.rerun()
+                                btn_col1, btn_col2 = col5.columns(2)
 
-                            if btn_col2.button("Decline", key=f"decline_{appt_id}", use_container_width=True):
-                                db.collection("appointments").document(appt_id).update({"status": "Declined"})
-                                st.rerun()
+                                if status == "Pending":  # Only show buttons if pending
+                                    if btn_col1.button("Accept", key=f"accept_{appt_id}", use_container_width=True):
+                                        change_appointment_statuses(db, watch, [appt_id], "Accepted")
+                                        st.rerun()
+
+                                    if btn_col2.button("Decline", key=f"decline_{appt_id}", use_container_width=True):
+                                        change_appointment_statuses(db, watch, [appt_id], "Declined")
+                                        st.rerun()
+
+                    st.divider()
+                    page_number = len(st.session_state.appointment_cursors)
+                    nav_col1, nav_col2, nav_col3 = st.columns([1, 4, 1])
+                    if nav_col1.button("← Previous", disabled=page_number == 1, use_container_width=True):
+                        st.session_state.appointment_cursors.pop()
+                        keep_trace(request_trace)
+                        st.rerun()
+                    nav_col2.caption(f"Page {page_number}")
+                    if nav_col3.button("Next →", disabled=not has_more, use_container_width=True):
+                        st.session_state.appointment_cursors.append(appointments[-1])
+                        keep_trace(request_trace)
+                        st.rerun()
 
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
+            keep_trace(request_trace)
 
     # --- B. PATIENT APP ---
     elif st.session_state.user_role == "patient":
         st.title("Patient Dashboard 🩺")
 
-        tab1, tab2 = st.tabs(["Find a Doctor 🔍", "My Appointments 🗓️"])
+        # Only the open tab runs; "My Appointments" is not read while "Find a Doctor" is in use
+        tab1, tab2 = st.tabs([FIND_DOCTOR_TAB, MY_APPOINTMENTS_TAB], key="patient_tab",
+                             on_change=on_patient_tab_change)
 
         # --- TAB 1: FIND A DOCTOR ---
         with tab1:
-            if not services_ready:
+            predictor = get_predictor()
+            if not (predictor and symptoms):
                 st.error("A core service (Maps, Database, or Model) could not be initialized.")
             else:
                 col1, col2 = st.columns([1, 1.2])
@@ -334,210 +764,115 @@ else:
                         label="Enter your City or Zip Code:",
                         placeholder="e.g., 'New Delhi' or '221002'"
                     )
+                    differential = st.toggle(
+                        "Also search for other likely conditions",
+                        help=f"Considers up to {DIFFERENTIAL_SIZE} likely conditions and searches for each of their "
+                             "specialists at once."
+                    )
                     find_doctor_button = st.button("Find a Doctor", type="primary", use_container_width=True)
 
                 with col2:
                     st.subheader("✨ Recommendations")
-                    confirmation_placeholder = st.empty()
-                    if st.session_state.booking_confirmation:
-                        confirmation_placeholder.success(st.session_state.booking_confirmation)
-                        st.session_state.booking_confirmation = None
 
                     with st.container(height=800):
 
                         if find_doctor_button:
                             if not user_symptoms or not user_location:
                                 st.warning("Please select at least one symptom or location.")
-                            else:
+                            elif gmaps := get_gmaps():
                                 st.session_state.prediction = None
                                 st.session_state.specialist = None
-                                st.session_state.doctors_list = []
-                                st.session_state.map_data_list = []
+                                st.session_state.differential = None
+                                st.session_state.specialists = None
+                                st.session_state.search_results = None
 
-                                with st.status("Finding recommendations...", expanded=True) as status:
+                                with tracing.trace("find_doctor") as request_trace, \
+                                        st.status("Finding recommendations...", expanded=True) as status:
                                     try:
-                                        st.write("Analyzing your symptoms...")
-                                        time.sleep(1)
-                                        model_input = {symptom: 0 for symptom in symptoms}
-                                        for symptom in user_symptoms:
-                                            if symptom in model_input:
-                                                model_input[symptom] = 1
-                                        input_df = pd.DataFrame([model_input])
-                                        st.session_state.prediction = model.predict(input_df)[0]
-
-                                        st.write("Identifying the right specialist...")
-                                        specialty_map = {
-                                            'Fungal infection': 'Dermatologist', 'Allergy': 'Allergist',
-                                            'GERD': 'Gastroenterologist',
-                                            'Acne': 'Dermatologist', 'Pneumonia': 'Pulmonologist',
-                                            'Jaundice': 'Gastroenterologist',
-                                            'Migraine': 'Neurologist', 'Hypertension ': 'Cardiologist',
-                                            'Heart attack': 'Cardiologist',
-                                            'Paralysis (brain hemorrhage)': 'Neurologist',
-                                            'Chicken pox': 'Dermatologist',
-                                            'Malaria': 'General Practitioner', 'Dengue': 'General Practitioner',
-                                            'Typhoid': 'General Practitioner'
-                                        }
-                                        st.session_state.specialist = specialty_map.get(st.session_state.prediction,
-                                                                                        'General Practitioner')
-
-                                        st.write(
-                                            f"Searching for {st.session_state.specialist}s near {user_location}...")
-                                        query = f"{st.session_state.specialist} in {user_location}"
-                                        places_result = gmaps.places(query=query, type='doctor')
-                                        st.session_state.doctors_list = places_result.get('results', [])[:5]
-
-                                        temp_map_data = []
-                                        for doctor in st.session_state.doctors_list:
-                                            place_id = doctor['place_id']
-                                            fields = ['name', 'formatted_address', 'international_phone_number',
-                                                      'website', 'rating', 'opening_hours', 'geometry']
-                                            place_details = gmaps.place(place_id=place_id, fields=fields)
-                                            details = place_details.get('result', {})
-                                            doctor['details'] = details
-                                            if 'geometry' in details:
-                                                location = details['geometry']['location']
-                                                temp_map_data.append(
-                                                    {'name': details.get('name', 'N/A'), 'lat': location['lat'],
-                                                     'lon': location['lng']})
-                                        st.session_state.map_data_list = temp_map_data
+                                        with tracing.span("status_write"):
+                                            st.write("Analyzing your symptoms...")
+                                        with tracing.span("predict"):
+                                            if differential:
+                                                st.session_state.differential = predictor.predict_top(
+                                                    user_symptoms, DIFFERENTIAL_SIZE, DIFFERENTIAL_MIN_PROBABILITY)
+                                                st.session_state.prediction = st.session_state.differential[0][0]
+                                            else:
+                                                st.session_state.prediction = predictor.predict(user_symptoms)
+
+                                        with tracing.span("status_write"):
+                                            st.write("Identifying the right specialist...")
+                                        with tracing.span("specialty_map"):
+                                            specialists_table = get_specialists_table()
+                                            st.session_state.specialist = get_specialist(
+                                                st.session_state.prediction, specialists_table)
+                                            # Weight each specialist by the probability of the conditions it treats
+                                            weights = {}
+                                            for condition, probability in \
+                                                    st.session_state.differential or [(st.session_state.prediction, 1.0)]:
+                                                specialist = get_specialist(condition, specialists_table)
+                                                weights[specialist] = weights.get(specialist, 0) + probability
+                                            st.session_state.specialists = list(weights)
+
+                                        # Results key on the geocoded place; the Places text query uses
+                                        # its region, so text searches are shared across a city
+                                        with tracing.span("geocode"):
+                                            location_resolver = get_location_resolver()
+                                            try:
+                                                resolved = location_resolver.resolve(gmaps, user_location)
+                                            except Exception as e:
+                                                print(f"Geocoding '{user_location}' failed: {e}")
+                                                resolved = None
+                                        search_location = resolved.region if resolved else user_location
+                                        center = (resolved.lat, resolved.lng) if resolved else None
+
+                                        with tracing.span("status_write"):
+                                            st.write(f"Searching for "
+                                                     f"{', '.join(f'{name}s' for name in st.session_state.specialists)} "
+                                                     f"near {search_location}...")
+                                        # Sessions running the same search share one results object
+                                        results_cache = get_search_results_cache()
+                                        search_key = results_key(resolved or user_location, weights)
+                                        search_results = results_cache.get(search_key)
+                                        if search_results is None:
+                                            # Known clinics near the location are served from the local index
+                                            clinic_index = get_clinic_index()
+                                            if clinic_index is not None and (db := get_db()):
+                                                index_registered_clinics(clinic_index, db, gmaps)
+                                            with tracing.span("places_search"):
+                                                doctors_list = search_specialists(
+                                                    gmaps, weights, search_location, index=clinic_index, center=center)
+
+                                            with tracing.span("place_details"):
+                                                details_cache = get_place_details_cache()
+                                                missing = [doctor['place_id'] for doctor in doctors_list
+                                                           if 'details' not in doctor]
+                                                fetched = dict(zip(missing, fetch_place_details(
+                                                    gmaps, missing, fields=DETAIL_FIELDS, cache=details_cache)))
+                                                if clinic_index is not None and fetched:
+                                                    clinic_index.set_details(fetched)
+
+                                            with tracing.span("map_data"):
+                                                search_results = SearchResults.from_places(doctors_list, fetched)
+                                                results_cache.set(search_key, search_results)
+                                        st.session_state.search_results = search_results
                                         status.update(label="Analysis Complete!", state="complete", expanded=False)
 
                                     except Exception as e:
                                         status.update(label="Error processing request", state="error")
                                         st.error(f"An error occurred: {e}")
+                                keep_trace(request_trace)
 
-                        if st.session_state.prediction:
-                            st.success(f"**Predicted Condition:** {st.session_state.prediction}")
-                            if find_doctor_button: st.balloons()
-                            st.markdown(f"### Recommended Specialist: **{st.session_state.specialist}**")
-                            st.divider()
-                            st.subheader(f"Top 5 {st.session_state.specialist}s near you:")
-
-                            if not st.session_state.doctors_list:
-                                st.warning("No doctors found matching your criteria.")
-                            else:
-                                for doctor in st.session_state.doctors_list:
-                                    details = doctor.get('details', {})
-                                    place_id = doctor['place_id']
-                                    name = details.get('name', 'N/A')
-                                    address = details.get('formatted_address', 'Address not available')
-                                    phone = details.get('international_phone_number', 'Phone not available')
-                                    website = details.get('website', None)
-                                    rating = details.get('rating', 'N/A')
-
-                                    open_now = "Status unknown"
-                                    if 'opening_hours' in details:
-                                        open_now = "🟢 Open now" if details['opening_hours'].get('open_now',
-                                                                                                False) else "🔴 Closed"
-
-                                    with st.container(border=True):
-                                        st.markdown(f"#### {name}")
-                                        st.write(f"**{rating}** ⭐ | {open_now}")
-                                        st.write(f"📍 **Address:** {address}")
-                                        st.write(f"📞 **Phone:** {phone}")
-
-                                        col_btn1, col_btn2, col_btn3 = st.columns(3)
-
-                                        with col_btn1:
-                                            if website:
-                                                st.link_button("Visit Website 🌐", url=website, use_container_width=True)
-                                            else:
-                                                st.button("Website N/A", disabled=True, use_container_width=True,
-                                                          key=f"web_na_{place_id}")
-                                        with col_btn2:
-                                            gmaps_url = f"https://www.google.com/maps/search/?api=1&query={name.replace(' ', '+')}&query_place_id={place_id}"
-                                            st.link_button("View on Map 🗺️", url=gmaps_url, use_container_width=True)
-
-                                        with col_btn3:
-                                            with st.popover("Book Appointment", use_container_width=True):
-                                                with st.form(key=f"book_form_{place_id}", clear_on_submit=True):
-                                                    st.markdown(f"**Book with {name}**")
-                                                    patient_name_input = st.text_input("Your Full Name",
-                                                                                       key=f"name_{place_id}")
-                                                    appt_date = st.date_input("Preferred Date",
-                                                                              min_value=datetime.date.today(),
-                                                                              key=f"date_{place_id}")
-                                                    appt_time = st.time_input("Preferred Time", key=f"time_{place_id}")
-
-                                                    submitted = st.form_submit_button("Request Appointment")
-
-                                                    if submitted:
-                                                        if not patient_name_input:
-                                                            st.warning("Please enter your name.")
-                                                        else:
-                                                            try:
-                                                                doc_ref = db.collection("appointments").document()
-                                                                doc_ref.set({
-                                                                    "patient_email": st.session_state.user['email'],
-                                                                    "patient_id": st.session_state.user['localId'],
-                                                                    "patient_name": patient_name_input,
-                                                                    "doctor_name": name,
-                                                                    "doctor_place_id": place_id,
-                                                                    "appointment_date": str(appt_date),
-                                                                    "appointment_time": str(appt_time),
-                                                                    "status": "Pending"
-                                                                })
-                                                                st.session_state.booking_confirmation = \
-                                                                    f"✅ Success! Your appointment request for {name} has been sent."
-                                                            except Exception as e:
-                                                                st.session_state.booking_confirmation = \
-                                                                    f"❌ Error: Could not book appointment. {e}"
-                                                            st.rerun()
-
-                                    st.write("")
-
-                            if st.session_state.map_data_list:
-                                st.divider()
-                                st.subheader("Doctor Locations:")
-                                map_df = pd.DataFrame(st.session_state.map_data_list)
-                                st.map(map_df, latitude='lat', longitude='lon', size=10, zoom=12)
-
-                        elif not st.session_state.prediction:
-                            st.info("Your results will appear here.")
+                        if find_doctor_button and st.session_state.prediction:
+                            st.balloons()
+                        render_recommendations()
 
         # --- TAB 2: MY APPOINTMENTS ---
         with tab2:
-            st.subheader(f"Your Appointment Status")
+            if tab2.open:
+                st.subheader(f"Your Appointment Status")
 
-            if not db:
-                st.error("Database client could not be initialized. Cannot check appointments.")
-            else:
-                try:
-                    user_id = st.session_state.user['localId']
-                    appointments_ref = db.collection("appointments") \
-                        .where("patient_id", "==", user_id) \
-                        .stream()
-
-                    appointments = list(appointments_ref)
-
-                    if not appointments:
-                        st.warning(f"You have no appointments. Find a doctor to get started!")
-                    else:
-                        st.success(f"Found {len(appointments)} appointments:")
-
-                        col1, col2, col3, col4 = st.columns([3, 2, 2, 1.5])
-                        col1.write("**Doctor**")
-                        col2.write("**Date**")
-                        col3.write("**Time**")
-                        col4.write("**Status**")
-                        st.divider()
-
-                        for appt in appointments:
-                            appt_data = appt.to_dict()
-                            col1, col2, col3, col4 = st.columns([3, 2, 2, 1.5])
-
-                            col1.write(appt_data.get("doctor_name"))
-                            col2.write(appt_data.get("appointment_date"))
-                            col3.write(appt_data.get("appointment_time"))
-
-                            status = appt_data.get("status", "Pending")
-                            if status == "Pending":
-                                col4.warning(status)
-                            elif status == "Accepted":
-                                col4.success(status)
-                            elif status == "Declined":
-                                col4.error(status)
-
-                except Exception as e:
-                    st.error(f"An error occurred while fetching appointments: {e}")
\ No newline at end of file
+                db = get_db()
+                if not db:
+                    st.error("Database client could not be initialized. Cannot check appointments.")
+                else:
+                    patient_appointments(db, st.session_state.user['localId'])
\ No newline at end of file
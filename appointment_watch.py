@@ -0,0 +1,166 @@
+"""Real-time, in-memory copies of each clinic's appointments.
+
+A `ClinicAppointments` keeps a Firestore `on_snapshot` listener open on one
+clinic's appointments and applies only the added, modified and removed documents
+it is sent. `AppointmentWatchRegistry` shares these across every session in the
+process: sessions lease a clinic on each rerun and renew the lease while their
+dashboard stays open, and a listener is torn down once no session has touched it
+for `idle_timeout` seconds. A listener that never delivers its first snapshot is
+closed, and the clinic is served by plain queries for `retry_after` seconds.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from appointments import clinic_appointments_query
+
+
+class CachedAppointment(namedtuple("CachedAppointment", "id data")):
+    """An appointment held in memory; quacks like a DocumentSnapshot for rendering."""
+
+    def to_dict(self):
+        return self.data
+
+
+class ClinicAppointments:
+    """Incrementally maintained copy of one clinic's appointments."""
+
+    def __init__(self, db, place_id):
+        self.place_id = place_id
+        self.version = 0
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = clinic_appointments_query(db, place_id).on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        with self._lock:
+            for change in changes:
+                document = change.document
+                if change.type.name == "REMOVED":
+                    self._docs.pop(document.id, None)
+                else:
+                    self._docs[document.id] = CachedAppointment(document.id, document.to_dict())
+            if changes:
+                self.version += 1
+        self._ready.set()
+
+    def apply_local(self, updates):
+        """Optimistically merges `{id: fields}` into the copy before Firestore confirms it.
+
+        Returns the replaced field values in the same shape, for rolling back.
+        """
+        previous = {}
+        with self._lock:
+            for appt_id, fields in updates.items():
+                appointment = self._docs.get(appt_id)
+                if appointment is None:
+                    continue
+                previous[appt_id] = {field: appointment.data.get(field) for field in fields}
+                self._docs[appt_id] = CachedAppointment(appt_id, {**appointment.data, **fields})
+            self.version += 1
+        return previous
+
+    def wait_until_ready(self, timeout=10):
+        """Blocks until the listener has delivered its first snapshot. Returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    def appointments(self):
+        """Returns `(version, appointments)`; the version changes whenever the contents do."""
+        with self._lock:
+            return self.version, list(self._docs.values())
+
+    def close(self):
+        self._watch.unsubscribe()
+
+
+class AppointmentWatchRegistry:
+    """Process-wide, reference-counted `ClinicAppointments`, one per clinic."""
+
+    def __init__(self, idle_timeout=300, retry_after=60):
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self._watches = {}
+        self._leases = {}  # place_id -> {session_id: last seen}
+        self._failed = {}  # place_id -> when its listener was given up on
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def acquire(self, db, place_id, session_id):
+        """Returns the clinic's live appointments, starting a listener if none is running.
+
+        Sessions should call this on every rerun; it also renews their lease. Returns
+        None for `retry_after` seconds after the clinic's listener failed to start.
+        """
+        with self._lock:
+            watch = self._watches.get(place_id)
+            if watch is None:
+                failed_at = self._failed.get(place_id)
+                if failed_at is not None and time.monotonic() - failed_at < self.retry_after:
+                    return None
+                self._failed.pop(place_id, None)
+                watch = self._watches[place_id] = ClinicAppointments(db, place_id)
+                self._leases[place_id] = {}
+                print(f"Started appointment listener for {place_id}")
+            self._leases[place_id][session_id] = time.monotonic()
+            self._start_reaper()
+        return watch
+
+    def touch(self, place_id, session_id):
+        """Renews a session's lease without starting a listener.
+
+        Returns the clinic's running `ClinicAppointments`, or None once it has been closed.
+        """
+        with self._lock:
+            watch = self._watches.get(place_id)
+            if watch is not None:
+                self._leases[place_id][session_id] = time.monotonic()
+        return watch
+
+    def fail(self, place_id, watch):
+        """Closes a listener that never became ready, so sessions fall back to querying Firestore."""
+        with self._lock:
+            if self._watches.get(place_id) is not watch:
+                return
+            del self._watches[place_id]
+            del self._leases[place_id]
+            self._failed[place_id] = time.monotonic()
+        watch.close()
+        print(f"Gave up on appointment listener for {place_id}; retrying in {self.retry_after}s")
+
+    def release(self, place_id, session_id):
+        """Drops a session's lease, e.g. on logout."""
+        with self._lock:
+            self._leases.get(place_id, {}).pop(session_id, None)
+
+    def reap(self):
+        """Expires stale leases and closes listeners that no session holds any more."""
+        now = time.monotonic()
+        closed = []
+        with self._lock:
+            for place_id, leases in list(self._leases.items()):
+                for session_id, last_seen in list(leases.items()):
+                    if now - last_seen > self.idle_timeout:
+                        del leases[session_id]
+                if not leases:
+                    closed.append(self._watches.pop(place_id))
+                    del self._leases[place_id]
+        for watch in closed:
+            watch.close()
+            print(f"Stopped idle appointment listener for {watch.place_id}")
+        return len(closed)
+
+    def _start_reaper(self):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_forever, name="appointment-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 4, 1))
+            self.reap()
+
+    def stats(self):
+        """Number of open listeners and the sessions holding each."""
+        with self._lock:
+            return {place_id: len(leases) for place_id, leases in self._leases.items()}
@@ -0,0 +1,133 @@
+"""Firestore queries for the appointments collection.
+
+The doctor dashboard filters, orders and pages on the server so it only ever
+reads one page of appointments. The queries need the composite indexes listed
+in firestore.indexes.json.
+"""
+import time
+
+import tracing
+
+STATUSES = ["Pending", "Accepted", "Declined"]
+PAGE_SIZE = 20
+# Firestore rejects batches and transactions with more writes than this.
+MAX_BATCH_WRITES = 500
+
+
+def clinic_appointments_query(db, place_id, status=None, start_date=None, end_date=None):
+    """Appointments of one clinic, optionally filtered by status and an inclusive date range."""
+    query = db.collection("appointments").where("doctor_place_id", "==", place_id)
+    if status:
+        query = query.where("status", "==", status)
+    # Dates are stored as ISO 'YYYY-MM-DD' strings, so string order is date order.
+    if start_date:
+        query = query.where("appointment_date", ">=", str(start_date))
+    if end_date:
+        query = query.where("appointment_date", "<=", str(end_date))
+    return query
+
+
+def fetch_page(db, place_id, status=None, start_date=None, end_date=None,
+               newest_first=True, page_size=PAGE_SIZE, cursor=None):
+    """Fetches one page of a clinic's appointments.
+
+    `cursor` is the last snapshot of the previous page (None for the first page).
+    Returns `(snapshots, has_more)`; pass `snapshots[-1]` as the cursor of the next page.
+    """
+    direction = "DESCENDING" if newest_first else "ASCENDING"
+    query = clinic_appointments_query(db, place_id, status, start_date, end_date) \
+        .order_by("appointment_date", direction=direction) \
+        .order_by("appointment_time", direction=direction)
+    if cursor is not None:
+        query = query.start_after(cursor)
+    # One extra document tells us whether there is a next page.
+    snapshots = list(query.limit(page_size + 1).stream())
+    tracing.count("firestore.reads", max(len(snapshots), 1))
+    return snapshots[:page_size], len(snapshots) > page_size
+
+
+def fetch_patient_appointments(db, patient_id):
+    """Every appointment one patient has requested, as plain dicts."""
+    snapshots = list(db.collection("appointments").where("patient_id", "==", patient_id).stream())
+    tracing.count("firestore.reads", max(len(snapshots), 1))
+    return [snapshot.to_dict() for snapshot in snapshots]
+
+
+def count_by_status(db, place_id, start_date=None, end_date=None):
+    """Counts a clinic's appointments per status with aggregation queries."""
+    counts = {}
+    for status in STATUSES:
+        result = clinic_appointments_query(db, place_id, status, start_date, end_date).count(alias="count").get()
+        counts[status] = int(result[0][0].value)
+    tracing.count("firestore.reads", len(STATUSES))
+    return counts
+
+
+def set_status_bulk(db, appt_ids, status, previous=None):
+    """Sets `status` on every appointment in `appt_ids` with batched writes.
+
+    Writes are committed in chunks of MAX_BATCH_WRITES. If a chunk fails, the chunks
+    already committed are put back to their `previous` statuses ({id: status};
+    appointments not listed go back to "Pending", the only status that can be bulk
+    updated) and the original error is re-raised.
+    Returns `(writes, commits, elapsed_seconds)`.
+    """
+    start = time.perf_counter()
+    collection = db.collection("appointments")
+    committed = []
+    commits = 0
+    try:
+        for i in range(0, len(appt_ids), MAX_BATCH_WRITES):
+            chunk = appt_ids[i:i + MAX_BATCH_WRITES]
+            batch = db.batch()
+            for appt_id in chunk:
+                batch.update(collection.document(appt_id), {"status": status})
+            batch.commit()
+            tracing.count("firestore.writes", len(chunk))
+            commits += 1
+            committed.extend(chunk)
+    except Exception:
+        previous = previous or {}
+        try:
+            for i in range(0, len(committed), MAX_BATCH_WRITES):
+                batch = db.batch()
+                for appt_id in committed[i:i + MAX_BATCH_WRITES]:
+                    batch.update(collection.document(appt_id), {"status": previous.get(appt_id) or "Pending"})
+                batch.commit()
+        except Exception as e:
+            print(f"Could not roll back {len(committed)} status update(s): {e}")
+        raise
+    return len(appt_ids), commits, time.perf_counter() - start
+
+
+def _sort_key(appointment):
+    data = appointment.to_dict()
+    return data.get("appointment_date", ""), data.get("appointment_time", ""), appointment.id
+
+
+def _matches(data, status, start_date, end_date):
+    date = data.get("appointment_date", "")
+    return ((not status or data.get("status") == status)
+            and (not start_date or date >= str(start_date))
+            and (not end_date or date <= str(end_date)))
+
+
+def page_in_memory(appointments, status=None, start_date=None, end_date=None,
+                   newest_first=True, page_size=PAGE_SIZE, cursor=None):
+    """Same contract as `fetch_page`, over appointments already held in memory."""
+    rows = sorted((appt for appt in appointments if _matches(appt.to_dict(), status, start_date, end_date)),
+                  key=_sort_key, reverse=newest_first)
+    if cursor is not None:
+        bound = _sort_key(cursor)
+        rows = [appt for appt in rows if (_sort_key(appt) < bound if newest_first else _sort_key(appt) > bound)]
+    return rows[:page_size], len(rows) > page_size
+
+
+def count_in_memory(appointments, start_date=None, end_date=None):
+    """Same contract as `count_by_status`, over appointments already held in memory."""
+    counts = {status: 0 for status in STATUSES}
+    for appt in appointments:
+        data = appt.to_dict()
+        if data.get("status") in counts and _matches(data, None, start_date, end_date):
+            counts[data["status"]] += 1
+    return counts
@@ -0,0 +1,128 @@
+"""Scores files of symptom sets in chunks with the app's model.
+
+Input is either CSV or JSONL:
+  * CSV with a `symptoms` column holding names separated by ';' (and an optional `id` column),
+  * CSV with one 0/1 column per symptom, like Training.csv,
+  * JSONL with one {"id": ..., "symptoms": [...]} object (or a bare list) per line.
+
+Output rows carry the id, predicted condition, confidence and specialist, and are
+written as each chunk is scored. Symptom names and specialists come from the
+manifest and table shipped with the model, as in the app. Usage:
+    python batch_predict.py intake.csv -o predictions.csv
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference import (MANIFEST_PATH, MODEL_PATH, SPECIALISTS_PATH, SymptomPredictor, check_manifest, get_specialist,
+                       load_manifest, load_specialists, read_symptoms)
+
+OUTPUT_FIELDS = ['id', 'predicted_condition', 'confidence', 'specialist']
+
+
+def _read_csv_chunks(path, predictor, chunk_size):
+    header = pd.read_csv(path, nrows=0).columns
+    if 'symptoms' in header:
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype={'symptoms': str}, keep_default_na=False):
+            ids = chunk['id'].tolist() if 'id' in chunk else None
+            selections = [[name.strip() for name in value.split(';') if name.strip()]
+                          for value in chunk['symptoms']]
+            yield ids, predictor.encode_many(selections)
+    else:
+        known = [col for col in header if col in predictor.index]
+        dtypes = {col: np.uint8 for col in known}
+        for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=known + (['id'] if 'id' in header else []),
+                                 dtype=dtypes):
+            ids = chunk['id'].tolist() if 'id' in chunk else None
+            matrix = chunk.reindex(columns=predictor.features, fill_value=0).to_numpy(dtype=np.uint8)
+            yield ids, matrix
+
+
+def _read_jsonl_chunks(path, predictor, chunk_size):
+    with open(path, encoding='utf-8') as f:
+        records = (json.loads(line) for line in f if line.strip())
+        while True:
+            batch = list(itertools.islice(records, chunk_size))
+            if not batch:
+                return
+            ids = [record.get('id') if isinstance(record, dict) else None for record in batch]
+            selections = [record['symptoms'] if isinstance(record, dict) else record for record in batch]
+            yield ids, predictor.encode_many(selections)
+
+
+def predict_file(path, predictor, chunk_size=10_000, specialists=None):
+    """Yields one list of output rows per chunk of `path`.
+
+    Each chunk is encoded into a uint8 matrix and scored with a single vectorized call.
+    Rows without an `id` are identified by their 0-based position in the input.
+    `specialists` is the condition -> specialist table shipped with the model, if any.
+    """
+    reader = _read_jsonl_chunks if path.endswith(('.jsonl', '.ndjson')) else _read_csv_chunks
+    offset = 0
+    for ids, matrix in reader(path, predictor, chunk_size):
+        conditions, confidences = predictor.predict_matrix(matrix)
+        ids = [row_id if row_id is not None else offset + i
+               for i, row_id in enumerate(ids if ids is not None else [None] * len(matrix))]
+        offset += len(matrix)
+        yield [{'id': row_id, 'predicted_condition': condition, 'confidence': round(float(confidence), 4),
+                'specialist': get_specialist(condition, specialists)}
+               for row_id, condition, confidence in zip(ids, conditions, confidences)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or JSONL file of symptom sets.")
+    parser.add_argument('input', help="CSV or JSONL file of symptom sets.")
+    parser.add_argument('-o', '--output', help="Output file (.csv or .jsonl). Defaults to CSV on stdout.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Path to the model artifact.")
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help="Symptom manifest shipped with the model.")
+    parser.add_argument('--specialists', default=SPECIALISTS_PATH,
+                        help="Condition -> specialist table shipped with the model.")
+    parser.add_argument('--chunk-size', type=int, default=10_000, help="Rows scored per model call.")
+    args = parser.parse_args(argv)
+
+    try:
+        symptoms = load_manifest(args.manifest)
+    except FileNotFoundError:
+        # No manifest yet: fall back to the header of Training.csv, like the app
+        symptoms = read_symptoms()
+    try:
+        specialists = load_specialists(args.specialists)
+    except FileNotFoundError:
+        specialists = None
+    model = joblib.load(args.model)
+    mismatch = check_manifest(model, symptoms)
+    if mismatch:
+        sys.exit(f"The symptom manifest does not match the model: {mismatch}")
+    predictor = SymptomPredictor(model, symptoms)
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    as_jsonl = bool(args.output) and args.output.endswith(('.jsonl', '.ndjson'))
+    writer = None if as_jsonl else csv.DictWriter(out, fieldnames=OUTPUT_FIELDS)
+    if writer:
+        writer.writeheader()
+
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in predict_file(args.input, predictor, args.chunk_size, specialists):
+            if writer:
+                writer.writerows(chunk)
+            else:
+                out.writelines(json.dumps(row) + '\n' for row in chunk)
+            rows += len(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/sec)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
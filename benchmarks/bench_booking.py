@@ -0,0 +1,95 @@
+"""Concurrent bookings against one clinic's day: no slot may be given out twice.
+
+--patients threads each read the day's free slots and try to book one of the
+first --choices of them, so many race for the same slots. Reports bookings made,
+bookings that lost their slot, the latency of reading availability and of booking,
+and verifies that every slot holds at most one appointment and every booked
+appointment holds its slot.
+
+Runs against the in-memory FakeFirestore by default. With FIRESTORE_EMULATOR_HOST
+set (e.g. `firebase emulators:start --only firestore`), it runs against the
+emulator instead:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.bench_booking
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from fakes import FakeFirestore
+from slots import SLOTS, SlotTaken, book_slot, free_slots, slots_document
+
+
+def client(latency):
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+        return firestore.Client(project=os.environ.get("GCLOUD_PROJECT", "demo-health-navigator"))
+    return FakeFirestore(latency=latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=40, help="Concurrent patients booking.")
+    parser.add_argument("--choices", type=int, default=4, help="Patients pick among this many earliest free slots.")
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated seconds per fake Firestore call.")
+    args = parser.parse_args()
+
+    db = client(args.latency)
+    place_id = f"bench-clinic-{uuid.uuid4().hex[:8]}"
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    start = threading.Barrier(args.patients)
+    lock = threading.Lock()
+    read_times, book_times, booked, conflicts, errors = [], [], [], [], []
+
+    def patient(number):
+        rng = random.Random(number)
+        start.wait()
+        began = time.perf_counter()
+        open_slots = free_slots(db, place_id, date)
+        read_elapsed = time.perf_counter() - began
+        if not open_slots:
+            return
+        slot = rng.choice(open_slots[:args.choices])
+        began = time.perf_counter()
+        try:
+            appt_id = book_slot(db, place_id, date, slot, {"patient_name": f"Bench Patient {number}",
+                                                           "patient_id": f"bench-patient-{number}",
+                                                           "doctor_name": "Bench Clinic", "status": "Pending"})
+            outcome = booked, (slot, appt_id)
+        except SlotTaken:
+            outcome = conflicts, slot
+        except Exception as e:
+            outcome = errors, e
+        with lock:
+            read_times.append(read_elapsed)
+            book_times.append(time.perf_counter() - began)
+            outcome[0].append(outcome[1])
+
+    threads = [threading.Thread(target=patient, args=(i,)) for i in range(args.patients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    taken = (slots_document(db, place_id, date).get().to_dict() or {}).get("taken", {})
+    slots_booked = [slot for slot, _ in booked]
+    assert len(slots_booked) == len(set(slots_booked)), "a slot was booked twice"
+    assert all(taken.get(slot) == appt_id for slot, appt_id in booked), "a booking does not hold its slot"
+    assert len(taken) == len(booked), "a slot is held without a booking"
+
+    backend = "emulator" if os.environ.get("FIRESTORE_EMULATOR_HOST") else f"fake ({args.latency * 1000:.0f} ms/call)"
+    print(f"{args.patients} patients racing for {args.choices} of {len(SLOTS)} slots on {backend}")
+    print(f"  booked {len(booked)}, lost the slot {len(conflicts)}, errors {len(errors)}; no slot double-booked")
+    for name, times in (("free slots", read_times), ("book", book_times)):
+        if times:
+            print(f"  {name:<11} median {statistics.median(times) * 1000:7.1f} ms, max {max(times) * 1000:7.1f} ms")
+    for error in errors[:3]:
+        print(f"  error: {error!r}")
+
+
+if __name__ == "__main__":
+    main()
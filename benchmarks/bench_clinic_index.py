@@ -0,0 +1,76 @@
+"""Nearby-doctor lookups from the clinic index versus Places, including clinics registered before specialties.
+
+Registers --legacy clinics whose doctor profiles predate the specialty field and
+one clinic with a specialty, indexes them with `sync_registered`, and checks that
+`ClinicIndex.lookup()` only counts the clinic with a specialty towards coverage,
+returning legacy clinics after it. Then indexes --searches Places text searches and reports
+the median lookup time next to one Places search at --latency.
+
+Run from the project root:
+    python -m benchmarks.bench_clinic_index --latency 0.2
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from clinic_index import ClinicIndex, sync_registered
+from fakes import FakeFirestore, FakeMapsClient
+from inference import SPECIALISTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per Maps request.")
+    parser.add_argument("--legacy", type=int, default=5, help="Registered clinics without a specialty.")
+    parser.add_argument("--searches", type=int, default=200, help="Places searches to index.")
+    parser.add_argument("--lookups", type=int, default=500, help="Lookups timed.")
+    args = parser.parse_args()
+
+    gmaps = FakeMapsClient(latency=args.latency)
+    index = ClinicIndex(os.path.join(tempfile.mkdtemp(prefix="health-nav-clinics-"), "clinics.sqlite3"),
+                        radius_km=25.0)
+    db = FakeFirestore()
+    legacy = [f"legacy_clinic_{i}" for i in range(args.legacy)]
+    for i, place_id in enumerate(legacy):
+        db.collection("doctors").document(f"legacy-doctor-{i}").set(
+            {"clinic_name": f"Legacy Clinic {i}", "address": f"{i} Old Street", "place_id": place_id})
+    db.collection("doctors").document("dermatologist").set(
+        {"clinic_name": "Skin Clinic", "address": "1 New Street", "place_id": "skin_clinic",
+         "specialty": "Dermatologist"})
+    print(f"Indexed {sync_registered(index, db, gmaps)} registered clinics")
+
+    center = gmaps.base_location
+    assert index.lookup(*center, "Cardiologist", min_results=1) is None, \
+        "registered clinics without a specialty counted as coverage"
+    found = [place['place_id'] for place in index.lookup(*center, "Dermatologist", min_results=1) or []]
+    assert found[:1] == ["skin_clinic"], "a registered clinic was not returned for its specialty"
+    assert set(found[1:]) <= set(legacy) and len(found) == 1 + min(args.legacy, 1), \
+        "registered clinics without a specialty were not returned after it"
+    print("  the dermatologist covers its own specialty; legacy clinics ride along, and cover none")
+
+    for i in range(args.searches):
+        specialist = SPECIALISTS[i % len(SPECIALISTS)]
+        index.add_search_results(specialist, FakeMapsClient().places(query=f"{specialist} in Town {i}")['results'])
+
+    rng = random.Random(0)
+    times = []
+    for _ in range(args.lookups):
+        lat, lng = center[0] + rng.uniform(-0.5, 0.5), center[1] + rng.uniform(-0.5, 0.5)
+        start = time.perf_counter()
+        index.lookup(lat, lng, rng.choice(SPECIALISTS))
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    gmaps.places(query="Cardiologist in New Delhi", type='doctor')
+    places = time.perf_counter() - start
+
+    print(f"{len(index)} clinics indexed, {args.lookups} lookups")
+    print(f"  index lookup: median {statistics.median(times) * 1000:7.2f} ms, max {max(times) * 1000:7.2f} ms")
+    print(f"  Places search:       {places * 1000:7.2f} ms")
+    print(f"  index stats: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Exercises the Maps gateway against a slow fake client: coalescing, rate limiting and timeouts.
+
+Run from the project root:
+    python -m benchmarks.bench_gateway --latency 0.5 --callers 50
+"""
+import argparse
+import threading
+import time
+
+from fakes import FakeMapsClient
+from maps_gateway import MapsGateway
+from places import DETAIL_FIELDS
+
+
+def _burst(gmaps, requests):
+    """Sends every request in `requests` (method, kwargs) at the same moment; returns the elapsed seconds and errors."""
+    start = threading.Barrier(len(requests))
+    errors = []
+
+    def call(method, kwargs):
+        start.wait()
+        try:
+            getattr(gmaps, method)(**kwargs)
+        except Exception as e:
+            errors.append(e)
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=call, args=request) for request in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - began, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per Maps request.")
+    parser.add_argument("--callers", type=int, default=50, help="Concurrent callers per scenario.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Gateway rate limit, requests per second.")
+    args = parser.parse_args()
+
+    same = [("place", {"place_id": "fake_trending_clinic", "fields": DETAIL_FIELDS})] * args.callers
+    print(f"{args.callers} callers, {args.latency * 1000:.0f} ms per upstream call")
+
+    for name, make in (("direct", lambda maps: maps), ("gateway", lambda maps: MapsGateway(maps, rate=args.rate))):
+        maps = FakeMapsClient(latency=args.latency)
+        elapsed, errors = _burst(make(maps), same)
+        print(f"  identical requests, {name:<8} {elapsed * 1000:8.1f} ms, {maps.calls['place']:>3} upstream calls, "
+              f"{len(errors)} errors")
+
+    maps = FakeMapsClient(latency=args.latency)
+    gateway = MapsGateway(maps, rate=args.rate, burst=args.rate / 2)
+    distinct = [("place", {"place_id": f"fake_clinic_{i}", "fields": DETAIL_FIELDS}) for i in range(args.callers)]
+    elapsed, errors = _burst(gateway, distinct)
+    print(f"  distinct requests at {args.rate:.0f}/s: {elapsed * 1000:8.1f} ms, {gateway.stats()}")
+
+    maps = FakeMapsClient(latency=args.latency)
+    gateway = MapsGateway(maps, timeout=args.latency / 2, max_retries=2, backoff=0.05)
+    elapsed, errors = _burst(gateway, same[:5])
+    print(f"  timeouts (limit {args.latency * 500:.0f} ms): {elapsed * 1000:8.1f} ms, {len(errors)} errors, "
+          f"{gateway.stats()}")
+
+
+if __name__ == "__main__":
+    main()
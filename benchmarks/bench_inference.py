@@ -0,0 +1,54 @@
+"""Per-call prediction latency: the old dict -> DataFrame path vs. SymptomPredictor.
+
+Run from the project root:
+    python -m benchmarks.bench_inference --calls 200
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.common import load_benchmark_model
+from inference import SymptomPredictor, read_symptoms
+
+
+def dataframe_predict(model, symptoms, selected):
+    """The prediction path the app used before SymptomPredictor."""
+    model_input = {symptom: 0 for symptom in symptoms}
+    for symptom in selected:
+        if symptom in model_input:
+            model_input[symptom] = 1
+    return model.predict(pd.DataFrame([model_input]))[0]
+
+
+def _per_call(fn, selections):
+    start = time.perf_counter()
+    for selected in selections:
+        fn(selected)
+    return (time.perf_counter() - start) / len(selections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="Distinct symptom combinations to score.")
+    args = parser.parse_args()
+
+    model = load_benchmark_model()
+    symptoms = read_symptoms()
+    rng = random.Random(0)
+    selections = [rng.sample(symptoms, rng.randint(1, 5)) for _ in range(args.calls)]
+
+    predictor = SymptomPredictor(model, symptoms)
+    dataframe = _per_call(lambda s: dataframe_predict(model, symptoms, s), selections)
+    cold = _per_call(predictor.predict, selections)
+    warm = _per_call(predictor.predict, selections)
+
+    print(f"Per-call latency over {args.calls} symptom combinations")
+    print(f"  dict -> DataFrame -> predict: {dataframe * 1e6:10.1f} us")
+    print(f"  SymptomPredictor (miss):      {cold * 1e6:10.1f} us")
+    print(f"  SymptomPredictor (hit):       {warm * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
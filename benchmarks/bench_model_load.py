@@ -0,0 +1,108 @@
+"""Load time and per-worker memory of the pickled model versus its memory-mapped export.
+
+Starts --workers fresh processes per format, the way several Streamlit server
+processes would each load the model, and keeps them all alive until every one has
+loaded it and made a prediction. RSS counts shared pages in full in every process;
+PSS (Linux only) divides them between the processes sharing them, so it shows
+what each worker really costs.
+
+Run from the project root (export the model first with `python flat_forest.py`):
+    python -m benchmarks.bench_model_load --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+import flat_forest
+from benchmarks.common import load_benchmark_model
+from inference import FLAT_MODEL_PATH, MODEL_PATH
+
+
+def memory_mb():
+    """Returns `(rss, pss)` of this process in MB; PSS is None where /proc/self/smaps_rollup is missing."""
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.split(":")[0] in ("Rss", "Pss")}
+        return fields["Rss"] / 1024, fields["Pss"] / 1024
+    except (OSError, KeyError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, None
+
+
+def _load_pickle(path):
+    return joblib.load(path)
+
+
+def _load_flat(path):
+    return flat_forest.load(path)
+
+
+FORMATS = {"pickle": _load_pickle, "mmap": _load_flat}
+
+
+def _worker(fmt, path, n_features, loaded, results):
+    rss_before, pss_before = memory_mb()
+    start = time.perf_counter()
+    model = FORMATS[fmt](path)
+    model.predict(np.zeros((1, n_features), dtype=np.uint8))
+    elapsed = time.perf_counter() - start
+    # Measure once every worker holds the model, so shared pages are split between them
+    loaded.wait()
+    rss_after, pss_after = memory_mb()
+    results.put({"load_ms": elapsed * 1000, "rss_mb": rss_after - rss_before,
+                 "pss_mb": None if pss_after is None else pss_after - pss_before})
+    loaded.wait()
+
+
+def measure(fmt, path, n_features, workers):
+    ctx = multiprocessing.get_context("spawn")
+    loaded = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_worker, args=(fmt, path, n_features, loaded, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    loaded.wait()
+    rows = [results.get() for _ in processes]
+    loaded.wait()
+    for process in processes:
+        process.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes per format.")
+    args = parser.parse_args()
+
+    pickle_path, flat_path = MODEL_PATH, FLAT_MODEL_PATH
+    if not os.path.exists(pickle_path):
+        tmpdir = tempfile.mkdtemp()
+        pickle_path = os.path.join(tmpdir, "model.pkl")
+        joblib.dump(load_benchmark_model(), pickle_path)
+    model = joblib.load(pickle_path)
+    if not flat_forest.exists(flat_path) or os.path.getmtime(pickle_path) > os.path.getmtime(
+            os.path.join(flat_path, flat_forest.META_FILE)):
+        flat_path = os.path.join(tempfile.mkdtemp(), "flat")
+        flat_forest.save(flat_forest.flatten(model), flat_path)
+        print(f"Exported a fresh flat model to {flat_path}")
+    sizes = {"pickle": os.path.getsize(pickle_path),
+             "mmap": sum(os.path.getsize(os.path.join(flat_path, name)) for name in os.listdir(flat_path))}
+
+    print(f"{args.workers} workers per format; memory is the increase over a bare interpreter")
+    print(f"{'format':<8}{'on disk MB':>12}{'load ms':>10}{'RSS MB':>10}{'PSS MB':>10}")
+    for fmt, path in (("pickle", pickle_path), ("mmap", flat_path)):
+        rows = measure(fmt, path, model.n_features_in_, args.workers)
+        pss = [row["pss_mb"] for row in rows if row["pss_mb"] is not None]
+        print(f"{fmt:<8}{sizes[fmt] / 2 ** 20:>12.1f}{statistics.median(row['load_ms'] for row in rows):>10.1f}"
+              f"{statistics.median(row['rss_mb'] for row in rows):>10.1f}"
+              f"{statistics.median(pss) if pss else float('nan'):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
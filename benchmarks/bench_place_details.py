@@ -0,0 +1,36 @@
+"""Compares sequential, concurrent and cached place-details lookups against the fake Maps client.
+
+Run from the project root:
+    python -m benchmarks.bench_place_details --latency 0.2
+"""
+import argparse
+
+from benchmarks.common import timed
+from fakes import FakeMapsClient
+from places import DETAIL_FIELDS, fetch_place_details
+from ttl_cache import TTLCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per Maps request.")
+    parser.add_argument("--results", type=int, default=5, help="Places returned per search.")
+    args = parser.parse_args()
+
+    gmaps = FakeMapsClient(latency=args.latency, results_per_query=args.results)
+    place_ids = [p['place_id'] for p in gmaps.places(query="Dermatologist in New Delhi")['results']]
+
+    sequential = timed(lambda: [gmaps.place(place_id=p, fields=DETAIL_FIELDS) for p in place_ids])
+    cache = TTLCache()
+    concurrent = timed(lambda: fetch_place_details(gmaps, place_ids, cache=cache))
+    cached = timed(lambda: fetch_place_details(gmaps, place_ids, cache=cache))
+
+    print(f"{len(place_ids)} details lookups at {args.latency * 1000:.0f} ms each")
+    print(f"  sequential: {sequential * 1000:8.1f} ms")
+    print(f"  concurrent: {concurrent * 1000:8.1f} ms")
+    print(f"  cached:     {cached * 1000:8.1f} ms")
+    print(f"  cache stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
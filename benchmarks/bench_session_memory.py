@@ -0,0 +1,110 @@
+"""Per-session memory of stored search results: raw Places dicts versus shared compact records.
+
+Simulates --sessions idle sessions that have each run one search, with searches
+drawn from --searches distinct (location, specialist) pairs, and stores results
+the old way (each session holds its own merged Places results with their details
+and a list of map points, turned into a DataFrame on every rerun) and the new way
+(each session references a shared `SearchResults`). Memory is what tracemalloc
+sees allocated for the stored results, divided by the number of sessions.
+
+Run from the project root:
+    python -m benchmarks.bench_session_memory --sessions 2000 --searches 50
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from fakes import FakeMapsClient
+from places import DETAIL_FIELDS, fetch_place_details, search_specialists
+from search_cache import CachedMapsClient, SearchCache
+from search_results import SearchResults, deep_size, results_key
+from ttl_cache import TTLCache
+
+SPECIALISTS = ["Dermatologist", "Cardiologist", "Gastroenterologist", "Neurologist", "General Physician"]
+
+
+def raw_session(gmaps, details_cache, location, specialist):
+    """What a session kept before: merged Places results with their details, plus the map points."""
+    doctors_list = search_specialists(gmaps, {specialist: 1.0}, location)
+    fetched = dict(zip([doctor['place_id'] for doctor in doctors_list],
+                       fetch_place_details(gmaps, [doctor['place_id'] for doctor in doctors_list],
+                                           fields=DETAIL_FIELDS, cache=details_cache)))
+    map_data_list = []
+    for doctor in doctors_list:
+        details = doctor.setdefault('details', fetched.get(doctor['place_id'], {}))
+        location_point = details['geometry']['location']
+        map_data_list.append({'name': details.get('name', 'N/A'), 'lat': location_point['lat'],
+                              'lon': location_point['lng']})
+    return {"doctors_list": doctors_list, "map_data_list": map_data_list}
+
+
+def compact_session(gmaps, details_cache, results_cache, location, specialist):
+    """What a session keeps now: a reference to the shared results of its search."""
+    weights = {specialist: 1.0}
+    key = results_key(location, weights)
+    results = results_cache.get(key)
+    if results is None:
+        doctors_list = search_specialists(gmaps, weights, location)
+        fetched = dict(zip([doctor['place_id'] for doctor in doctors_list],
+                           fetch_place_details(gmaps, [doctor['place_id'] for doctor in doctors_list],
+                                               fields=DETAIL_FIELDS, cache=details_cache)))
+        results = SearchResults.from_places(doctors_list, fetched)
+        results_cache.set(key, results)
+    return {"search_results": results}
+
+
+def measure(make_session, sessions, pairs, rng):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [make_session(*rng.choice(pairs)) for _ in range(sessions)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return states, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000, help="Simulated sessions.")
+    parser.add_argument("--searches", type=int, default=50, help="Distinct searches the sessions ran.")
+    parser.add_argument("--reruns", type=int, default=200, help="Reruns timed for the map frame.")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="health-nav-memory-")
+    gmaps = CachedMapsClient(FakeMapsClient(), SearchCache(os.path.join(tmpdir, "search.sqlite3")))
+    details_cache = TTLCache(maxsize=10_000)
+    pairs = [(f"Town {i}", SPECIALISTS[i % len(SPECIALISTS)]) for i in range(args.searches)]
+    # Warm the search and details caches so both runs measure only what the sessions hold
+    for location, specialist in pairs:
+        raw_session(gmaps, details_cache, location, specialist)
+
+    raw_states, raw_bytes = measure(lambda *pair: raw_session(gmaps, details_cache, *pair),
+                                    args.sessions, pairs, random.Random(0))
+    results_cache = TTLCache(maxsize=512)
+    compact_states, compact_bytes = measure(
+        lambda *pair: compact_session(gmaps, details_cache, results_cache, *pair),
+        args.sessions, pairs, random.Random(0))
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        pd.DataFrame(raw_states[i % len(raw_states)]["map_data_list"])
+    raw_rerun = (time.perf_counter() - start) / args.reruns
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        compact_states[i % len(compact_states)]["search_results"].map_data
+    compact_rerun = (time.perf_counter() - start) / args.reruns
+
+    print(f"{args.sessions} sessions, {args.searches} distinct searches")
+    print(f"{'representation':<16}{'bytes/session':>15}{'one result set':>16}{'map frame/rerun':>18}")
+    print(f"{'raw dicts':<16}{raw_bytes / args.sessions:>15,.0f}{deep_size(raw_states[0]):>16,}"
+          f"{raw_rerun * 1e6:>15.1f} us")
+    print(f"{'compact shared':<16}{compact_bytes / args.sessions:>15,.0f}"
+          f"{deep_size(compact_states[0]['search_results']):>16,}{compact_rerun * 1e6:>15.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Cold-start time of a fresh worker: import time and first render of the login page.
+
+Each run happens in a new interpreter so nothing is warm. Run from the project root:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Executed in a fresh interpreter for every run.
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file('app.py', default_timeout=120)
+at.run()
+rendered = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'first_render_s': rendered - imported,
+    'title': at.title[0].value if at.title else None,
+    'errors': [e.value for e in at.error],
+    'loaded': [m for m in ('googlemaps', 'firebase_admin', 'pyrebase', 'sklearn') if m in sys.modules],
+}))
+"""
+
+
+def measure_once():
+    """Runs one cold start in a subprocess and returns its measurements."""
+    output = subprocess.run([sys.executable, "-c", _CHILD], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure.")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    last = runs[-1]
+    print(f"Cold start over {args.runs} runs (median)")
+    print(f"  streamlit import: {statistics.median(r['import_s'] for r in runs) * 1000:8.1f} ms")
+    print(f"  first render:     {statistics.median(r['first_render_s'] for r in runs) * 1000:8.1f} ms")
+    print(f"  page title:       {last['title']!r}")
+    print(f"  service modules loaded at first render: {last['loaded'] or 'none'}")
+    if last['errors']:
+        print(f"  errors: {last['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import time
+
+import joblib
+import pandas as pd
+
+import inference
+
+
+def timed(fn):
+    """Calls `fn()` and returns the seconds it took."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def load_benchmark_model():
+    """Loads the app's model, or fits a small stand-in on Training.csv when it is not present."""
+    if os.path.exists(inference.MODEL_PATH):
+        return joblib.load(inference.MODEL_PATH)
+    from sklearn.tree import DecisionTreeClassifier
+    print(f"{inference.MODEL_PATH} not found; fitting a DecisionTreeClassifier stand-in on Training.csv")
+    data = pd.read_csv(inference.TRAINING_CSV)
+    symptoms = inference.read_symptoms()
+    return DecisionTreeClassifier(random_state=0).fit(data[symptoms], data['prognosis'])
@@ -0,0 +1,400 @@
+"""Multi-session load generator: throughput and tail latency under concurrency.
+
+Hundreds of simulated sessions log in, search for doctors, book appointments and
+refresh the doctor dashboard at the same time, spread over several worker
+processes the way a Streamlit deployment runs several server processes. Each
+session is a thread that drives the same helpers as the app's handlers (the
+Streamlit script itself cannot be run concurrently in one process with AppTest),
+and each worker shares its caches, predictor and appointment listeners between its
+sessions like `st.cache_resource` does. Workers load the model with
+`inference.load_model()` from its memory-mapped export, as the app does, so the
+per-worker memory figures match a deployed worker's.
+
+Maps, Firestore and Auth are the stand-ins in fakes.py with --latency seconds per
+call. Each worker has its own in-memory Firestore and Auth and its own Maps gateway;
+the Places search cache, the location cache and the clinic index are SQLite files
+shared by every worker, as in production.
+
+Run from the project root:
+    python -m benchmarks.load_test --workers 4 --sessions 200 --duration 30
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import joblib
+
+import flat_forest
+import inference
+from appointment_watch import AppointmentWatchRegistry
+from appointments import count_by_status, count_in_memory, fetch_page, page_in_memory
+from benchmarks.common import load_benchmark_model
+from fakes import FakeAuth, FakeFirestore, FakeMapsClient
+from clinic_index import ClinicIndex
+from locations import LocationResolver
+from maps_gateway import MapsGateway
+from places import DETAIL_FIELDS, fetch_place_details, search_specialists
+from roles import resolve_role
+from search_cache import CachedMapsClient, SearchCache
+from search_results import SearchResults, results_key
+from slots import SlotTaken, book_slot, free_slots
+from ttl_cache import TTLCache
+
+OPERATIONS = ["login", "search", "book", "dashboard"]
+
+# What a session does between logins, by role (relative weights)
+PATIENT_MIX = {"search": 6, "book": 2, "login": 1}
+DOCTOR_MIX = {"dashboard": 8, "login": 1}
+
+# A few popular places and a long tail, so some searches repeat and some do not
+LOCATIONS = ["New Delhi", "Mumbai", "Bengaluru", "Lucknow", "Varanasi", "Pune", "Jaipur", "Kolkata"] + \
+            [f"Town {i}" for i in range(200)]
+# Other ways patients type some of them
+ALIASES = {"New Delhi": ["new delhi", "New Delhi ", "110001"], "Mumbai": ["mumbai", "Bombay", "400001"],
+           "Bengaluru": ["Bangalore", "bengaluru"], "Varanasi": ["varanasi", "221 002"]}
+PASSWORD = "load-test-password"
+
+
+class Worker:
+    """The process-wide state one server process would hold, plus the recorded samples."""
+
+    def __init__(self, args, index, model_path, flat_model_path, cache_path, clinic_index_path, location_cache_path):
+        self.args = args
+        self.index = index
+        self.rng = random.Random(index)
+        self.gateway = MapsGateway(FakeMapsClient(latency=args.latency))
+        self.gmaps = CachedMapsClient(self.gateway, SearchCache(cache_path))
+        self.db = FakeFirestore(latency=args.latency)
+        self.auth = FakeAuth(latency=args.latency)
+        self.symptoms = inference.read_symptoms()
+        self.predictor = inference.SymptomPredictor(inference.load_model(model_path, flat_model_path), self.symptoms)
+        self.details_cache = TTLCache(maxsize=2048, ttl=60 * 60)
+        self.results_cache = TTLCache(maxsize=512, ttl=10 * 60)
+        self.clinic_index = ClinicIndex(clinic_index_path)
+        self.locations = LocationResolver(SearchCache(location_cache_path))
+        self.role_cache = TTLCache(maxsize=10_000)
+        self.watches = AppointmentWatchRegistry(idle_timeout=5 * 60)
+        self.clinics = [f"load-clinic-{index}-{i}" for i in range(args.clinics)]
+        self.samples = []  # (operation, started_at, seconds, ok)
+        self.slot_conflicts = 0
+        self._lock = threading.Lock()
+
+    def seed(self, sessions):
+        """Creates the accounts, doctor profiles and existing appointments."""
+        for i, clinic in enumerate(self.clinics):
+            doctor = self.auth.create_user_with_email_and_password(f"doctor-{self.index}-{i}@example.com", PASSWORD)
+            self.db.collection("doctors").document(doctor["localId"]).set(
+                {"email": doctor["email"], "clinic_name": f"Load Clinic {i}", "address": f"{i} Load Street",
+                 "place_id": clinic})
+            batch = self.db.batch()
+            for j in range(self.args.appointments):
+                batch.set(self.db.collection("appointments").document(f"{clinic}-{j:05d}"), {
+                    "patient_name": f"Patient {j}", "patient_id": f"patient-{j}", "doctor_place_id": clinic,
+                    "doctor_name": f"Load Clinic {i}",
+                    "appointment_date": f"2026-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}",
+                    "appointment_time": f"{self.rng.randint(9, 17):02d}:00:00",
+                    "status": self.rng.choice(["Pending", "Accepted", "Declined"])})
+                if (j + 1) % 500 == 0:
+                    batch.commit()
+                    batch = self.db.batch()
+            batch.commit()
+        for i in range(sessions):
+            self.auth.create_user_with_email_and_password(f"patient-{self.index}-{i}@example.com", PASSWORD)
+
+    def record(self, operation, started_at, elapsed, ok):
+        with self._lock:
+            self.samples.append((operation, started_at, elapsed, ok))
+
+
+class Session:
+    """One simulated user, acting in a loop until the deadline."""
+
+    def __init__(self, worker, number, doctor):
+        self.worker = worker
+        self.rng = random.Random(f"{worker.index}-{number}")
+        self.session_id = uuid.uuid4().hex
+        if doctor:
+            self.email = f"doctor-{worker.index}-{number % len(worker.clinics)}@example.com"
+            self.mix = DOCTOR_MIX
+        else:
+            self.email = f"patient-{worker.index}-{number}@example.com"
+            self.mix = PATIENT_MIX
+        self.user = None
+        self.profile = None
+        self.search_results = None
+
+    def run(self, deadline):
+        self._timed("login")
+        while time.monotonic() < deadline:
+            time.sleep(self.rng.expovariate(1 / self.worker.args.think_time))
+            operation = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            if operation == "book" and not self.search_results:
+                operation = "search"
+            self._timed(operation)
+
+    def _timed(self, operation):
+        start = time.perf_counter()
+        ok = True
+        try:
+            getattr(self, operation)()
+        except Exception as e:
+            ok = False
+            print(f"{operation} failed: {e}")
+        self.worker.record(operation, time.monotonic(), time.perf_counter() - start, ok)
+
+    def login(self):
+        """Login form submit: sign in, then resolve the role through the shared cache."""
+        worker = self.worker
+        self.user = worker.auth.sign_in_with_email_and_password(self.email, PASSWORD)
+        role, profile = resolve_role(worker.db, self.user["localId"], worker.role_cache)
+        self.profile = dict(profile) if role == "doctor" else None
+
+    def search(self):
+        """The "Find a Doctor" click: predict, map to a specialist, search nearby clinics, fetch the details."""
+        worker = self.worker
+        user_symptoms = self.rng.sample(worker.symptoms, self.rng.randint(1, 5))
+        # Popular places are searched far more often than the long tail
+        location = LOCATIONS[min(int(self.rng.paretovariate(1.2)) - 1, len(LOCATIONS) - 1)]
+        location = self.rng.choice([location] + ALIASES.get(location, []))
+        prediction = worker.predictor.predict(user_symptoms)
+        specialist = inference.get_specialist(prediction)
+        resolved = worker.locations.resolve(worker.gmaps, location)
+        # Like the app, search the raw text when the geocoder finds nothing
+        search_location = resolved.region if resolved else location
+        center = (resolved.lat, resolved.lng) if resolved else None
+        weights = {specialist: 1.0}
+        key = results_key(resolved or location, weights)
+        self.search_results = worker.results_cache.get(key)
+        if self.search_results is not None:
+            return
+        doctors_list = search_specialists(worker.gmaps, weights, search_location,
+                                          index=worker.clinic_index, center=center)
+        missing = [doctor['place_id'] for doctor in doctors_list if 'details' not in doctor]
+        fetched = dict(zip(missing, fetch_place_details(worker.gmaps, missing, fields=DETAIL_FIELDS,
+                                                        cache=worker.details_cache)))
+        if fetched:
+            worker.clinic_index.set_details(fetched)
+        self.search_results = SearchResults.from_places(doctors_list, fetched)
+        worker.results_cache.set(key, self.search_results)
+
+    def book(self):
+        """Booking form: read the free slots of a day, then claim one; requests go to the registered clinics."""
+        worker = self.worker
+        doctor = self.rng.choice(self.search_results.doctors)
+        place_id = self.rng.choice(worker.clinics)
+        date = datetime.date.today() + datetime.timedelta(days=self.rng.randint(1, 14))
+        open_slots = free_slots(worker.db, place_id, date)
+        if not open_slots:
+            return
+        try:
+            book_slot(worker.db, place_id, date, self.rng.choice(open_slots), {
+                "patient_email": self.user['email'],
+                "patient_id": self.user['localId'],
+                "patient_name": f"Load Patient {self.email}",
+                "doctor_name": doctor.name,
+                "status": "Pending"
+            })
+        except SlotTaken:
+            with worker._lock:
+                worker.slot_conflicts += 1
+
+    def dashboard(self):
+        """Doctor dashboard rerun: status counts and the first page of appointments."""
+        worker = self.worker
+        place_id = self.profile['place_id']
+        watch = worker.watches.acquire(worker.db, place_id, self.session_id) if worker.args.realtime else None
+        if watch is not None and not watch.wait_until_ready():
+            worker.watches.fail(place_id, watch)
+            watch = None
+        if watch is not None:
+            _, cached_appointments = watch.appointments()
+            count_in_memory(cached_appointments)
+            page_in_memory(cached_appointments)
+        else:
+            count_by_status(worker.db, place_id)
+            fetch_page(worker.db, place_id)
+
+
+def _run_worker(args, index, sessions, model_path, flat_model_path, cache_path, clinic_index_path,
+                location_cache_path, ready, results):
+    worker = Worker(args, index, model_path, flat_model_path, cache_path, clinic_index_path, location_cache_path)
+    doctors = round(sessions * args.doctor_share)
+    worker.seed(sessions)
+    ready.wait()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.monotonic()
+    deadline = start + args.warmup + args.duration
+    threads = [threading.Thread(target=Session(worker, i, doctor=i < doctors).run, args=(deadline,), daemon=True)
+               for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    results.put({
+        "worker": index,
+        "sessions": sessions,
+        "samples": [(operation, seconds, ok) for operation, started_at, seconds, ok in worker.samples
+                    if started_at - start >= args.warmup],
+        "cpu_seconds": cpu,
+        "cpu_percent": 100 * cpu / elapsed,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": after.ru_maxrss / 1024,
+        "calls": {**{f"maps.{k}": v for k, v in worker.gmaps.client.calls.items()},
+                  **{f"firestore.{k}": v for k, v in worker.db.calls.items()}},
+        "locations": worker.locations.stats(),
+        "gateway": worker.gateway.stats(),
+        "slot_conflicts": worker.slot_conflicts,
+    })
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))]
+
+
+def _latency_row(samples):
+    times = sorted(seconds for seconds, ok in samples)
+    return {"count": len(times), "errors": sum(not ok for _, ok in samples),
+            **{f"p{q}": percentile(times, q) * 1000 for q in (50, 95, 99)},
+            "max": times[-1] * 1000 if times else float("nan")}
+
+
+def summarize(worker_results, duration):
+    """Aggregates the workers' samples into throughput, latency percentiles and resource usage."""
+    by_operation = defaultdict(list)
+    for result in worker_results:
+        for operation, seconds, ok in result["samples"]:
+            by_operation[operation].append((seconds, ok))
+    everything = [sample for samples in by_operation.values() for sample in samples]
+    calls = defaultdict(int)
+    locations = defaultdict(int)
+    for result in worker_results:
+        for name, value in result["calls"].items():
+            calls[name] += value
+        for name in ("hits", "misses"):
+            locations[name] += result["locations"][name]
+    lookups = locations["hits"] + locations["misses"]
+    gateway = {name: sum(result["gateway"][name] for result in worker_results)
+               for name in ("requests", "coalesced", "upstream_calls", "retries", "timeouts", "errors")}
+    upstream = gateway["upstream_calls"]
+    gateway["mean_queue_ms"] = sum(result["gateway"]["mean_queue_ms"] * result["gateway"]["upstream_calls"]
+                                   for result in worker_results) / upstream if upstream else 0.0
+    gateway["max_queue_ms"] = max(result["gateway"]["max_queue_ms"] for result in worker_results)
+    return {
+        "throughput": len(everything) / duration,
+        "operations": {operation: {**_latency_row(by_operation[operation]),
+                                   "throughput": len(by_operation[operation]) / duration}
+                       for operation in OPERATIONS if by_operation[operation]},
+        "overall": _latency_row(everything),
+        "workers": [{key: result[key] for key in ("worker", "sessions", "cpu_seconds", "cpu_percent", "peak_rss_mb")}
+                    for result in sorted(worker_results, key=lambda r: r["worker"])],
+        "calls": dict(calls),
+        "locations": {**locations, "hit_rate": locations["hits"] / lookups if lookups else 0.0},
+        "gateway": gateway,
+        "slot_conflicts": sum(result["slot_conflicts"] for result in worker_results),
+    }
+
+
+def print_report(summary, args):
+    print(f"\n{args.sessions} sessions on {args.workers} workers for {args.duration:.0f}s "
+          f"(latency {args.latency * 1000:.0f} ms, think time {args.think_time:.1f}s, "
+          f"{'listeners' if args.realtime else 'queries'} for the dashboard)")
+    print(f"Throughput: {summary['throughput']:.1f} ops/s\n")
+    print(f"{'operation':<12}{'count':>8}{'errors':>8}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}")
+    for operation, row in [*summary["operations"].items(), ("overall", {**summary["overall"],
+                                                                        "throughput": summary["throughput"]})]:
+        print(f"{operation:<12}{row['count']:>8}{row['errors']:>8}{row['throughput']:>9.1f}{row['p50']:>10.1f}"
+              f"{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}")
+    print(f"\n{'worker':<8}{'sessions':>10}{'cpu s':>9}{'cpu %':>8}{'peak RSS MB':>13}")
+    for row in summary["workers"]:
+        print(f"{row['worker']:<8}{row['sessions']:>10}{row['cpu_seconds']:>9.1f}{row['cpu_percent']:>8.1f}"
+              f"{row['peak_rss_mb']:>13.1f}")
+    print(f"\nExternal calls: {json.dumps(summary['calls'], sort_keys=True)}")
+    locations = summary["locations"]
+    print(f"Location cache: {locations['hit_rate']:.1%} hit rate, {locations['hits']} geocoding calls avoided, "
+          f"{locations['misses']} made")
+    gateway = summary["gateway"]
+    print(f"Maps gateway: {gateway['requests']} requests, {gateway['coalesced']} coalesced, "
+          f"{gateway['upstream_calls']} upstream calls ({gateway['retries']} retries, {gateway['errors']} errors), "
+          f"queueing delay mean {gateway['mean_queue_ms']:.1f} ms, max {gateway['max_queue_ms']:.1f} ms")
+    print(f"Bookings that lost their slot to a concurrent booking: {summary['slot_conflicts']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Worker processes.")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent sessions, spread over the workers.")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring starts.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between a session's actions.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per external call.")
+    parser.add_argument("--doctor-share", type=float, default=0.2, help="Fraction of sessions that are doctors.")
+    parser.add_argument("--clinics", type=int, default=5, help="Registered clinics per worker.")
+    parser.add_argument("--appointments", type=int, default=500, help="Existing appointments per clinic.")
+    parser.add_argument("--no-realtime", dest="realtime", action="store_false",
+                        help="Serve the dashboard with Firestore queries instead of listeners.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="health-nav-load-")
+    model_path, flat_model_path = inference.MODEL_PATH, inference.FLAT_MODEL_PATH
+    if not os.path.exists(model_path):
+        model_path = os.path.join(tmpdir, "model.pkl")
+        joblib.dump(load_benchmark_model(), model_path)
+    # Export the model next to the pickle unless an up-to-date export ships with it
+    if not flat_forest.exists(flat_model_path) or os.path.getmtime(model_path) > os.path.getmtime(
+            os.path.join(flat_model_path, flat_forest.META_FILE)):
+        flat_model_path = os.path.join(tmpdir, "model")
+        flat_forest.save(flat_forest.flatten(joblib.load(model_path)), flat_model_path)
+    cache_path = os.path.join(tmpdir, "search.sqlite3")
+    clinic_index_path = os.path.join(tmpdir, "clinics.sqlite3")
+    location_cache_path = os.path.join(tmpdir, "locations.sqlite3")
+    # Create the schemas before the workers race to
+    SearchCache(cache_path)
+    ClinicIndex(clinic_index_path)
+    SearchCache(location_cache_path)
+
+    ready = multiprocessing.Barrier(args.workers + 1)
+    results = multiprocessing.Queue()
+    sessions = [args.sessions // args.workers + (i < args.sessions % args.workers) for i in range(args.workers)]
+    processes = [multiprocessing.Process(target=_run_worker,
+                                         args=(args, i, sessions[i], model_path, flat_model_path, cache_path,
+                                               clinic_index_path, location_cache_path, ready, results))
+                 for i in range(args.workers)]
+    for process in processes:
+        process.start()
+    print(f"Seeding {args.workers} workers...")
+    ready.wait()
+    print(f"Running {args.sessions} sessions for {args.warmup + args.duration:.0f}s "
+          f"(the first {args.warmup:.0f}s are not measured)...")
+    worker_results = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = summarize(worker_results, args.duration)
+    print_report(summary, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), **summary}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
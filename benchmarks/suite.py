@@ -0,0 +1,240 @@
+"""End-to-end benchmark suite that runs app.py offline with Streamlit's AppTest.
+
+Maps, Firestore and Auth are replaced with the deterministic stand-ins in fakes.py
+(see services.use_backends), each call delayed by --latency seconds. Results are
+compared with benchmarks/baseline.json and any scenario that got slower (or, for
+throughput, lower) by more than --tolerance is flagged; the exit status is 1 if
+anything regressed.
+
+Run from the project root:
+    python -m benchmarks.suite                  # compare with the baseline
+    python -m benchmarks.suite --save-baseline  # record a new baseline
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+import joblib
+from streamlit.testing.v1 import AppTest
+
+import inference
+import services
+from benchmarks.common import load_benchmark_model, timed
+from fakes import FakeAuth, FakeFirestore, FakeMapsClient
+from maps_gateway import MapsGateway
+from search_cache import CachedMapsClient, SearchCache
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SCENARIOS = []
+
+
+def scenario(fn):
+    SCENARIOS.append(fn)
+    return fn
+
+
+class Backends:
+    """The fake services shared by every AppTest run of the suite."""
+
+    def __init__(self, latency):
+        self.tmpdir = tempfile.mkdtemp(prefix="health-nav-bench-")
+        self.maps = FakeMapsClient(latency=latency)
+        self.gmaps = CachedMapsClient(MapsGateway(self.maps), SearchCache(os.path.join(self.tmpdir, "search.sqlite3")))
+        self.db = FakeFirestore(latency=latency)
+        self.auth = FakeAuth(latency=latency)
+        services.use_backends(gmaps=self.gmaps, db=self.db, auth=self.auth)
+
+    def app(self, user=None, role=None, **secrets):
+        """A fresh AppTest session, optionally already logged in."""
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.secrets["clinic_index"] = {"path": os.path.join(self.tmpdir, "clinics.sqlite3")}
+        at.secrets["location_cache"] = {"path": os.path.join(self.tmpdir, "locations.sqlite3")}
+        for section, values in secrets.items():
+            at.secrets[section] = values
+        if user:
+            at.session_state.user = user
+            at.session_state.user_role = role
+        return at
+
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return at
+
+
+def _latency_result(samples):
+    samples = sorted(samples)
+    return {"unit": "ms", "median": statistics.median(samples) * 1000,
+            "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000}
+
+
+@scenario
+def login(backends, args):
+    """Submitting the login form until the patient dashboard has rendered."""
+    backends.auth.create_user_with_email_and_password("bench-patient@example.com", "secret123")
+    samples = []
+    for _ in range(args.runs + 1):
+        at = _check(backends.app().run())
+        at.text_input[0].input("bench-patient@example.com")
+        at.text_input[1].input("secret123")
+        login_button = next(b for b in at.button if b.label == "Login")
+        samples.append(timed(lambda: login_button.click().run()))
+        if _check(at).session_state.user is None:
+            raise RuntimeError("login did not succeed")
+    # The first login also loads the model for the patient dashboard; leave it out
+    return _latency_result(samples[1:])
+
+
+def _find_doctor(backends, args, location):
+    patient = {"email": "bench-patient@example.com", "localId": "bench-patient"}
+    at = _check(backends.app(patient, "patient").run())
+    at.multiselect[0].select("itching").select("skin_rash")
+    at.text_input[0].input(location)
+    _check(at.run())
+    button = next(b for b in at.button if b.label == "Find a Doctor")
+    elapsed = timed(lambda: button.click().run())
+    if not _check(at).session_state.search_results:
+        raise RuntimeError("no doctors found")
+    return elapsed
+
+
+@scenario
+def find_doctor_cold(backends, args):
+    """A "Find a Doctor" click whose search and place details are not cached."""
+    return _latency_result([_find_doctor(backends, args, f"Bench City {random.random()}")
+                            for _ in range(args.runs)])
+
+
+@scenario
+def find_doctor_warm(backends, args):
+    """A "Find a Doctor" click for a search that has been run before."""
+    _find_doctor(backends, args, "Bench City")
+    return _latency_result([_find_doctor(backends, args, "Bench City") for _ in range(args.runs)])
+
+
+def _seed_clinic(backends, place_id, n):
+    doctor_id = f"bench-doctor-{place_id}"
+    backends.db.collection("doctors").document(doctor_id).set(
+        {"email": "doctor@example.com", "clinic_name": "Bench Clinic", "address": "1 Bench Street",
+         "place_id": place_id})
+    rng = random.Random(0)
+    batch = backends.db.batch()
+    for i in range(n):
+        batch.set(backends.db.collection("appointments").document(f"{place_id}-{i:06d}"), {
+            "patient_name": f"Patient {i}", "patient_id": f"patient-{i}", "doctor_place_id": place_id,
+            "doctor_name": "Bench Clinic",
+            "appointment_date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "appointment_time": f"{rng.randint(9, 17):02d}:00:00",
+            "status": rng.choice(["Pending", "Accepted", "Declined"])})
+        if (i + 1) % 500 == 0:
+            batch.commit()
+            batch = backends.db.batch()
+    batch.commit()
+    return {"email": "doctor@example.com", "localId": doctor_id}
+
+
+def _dashboard(backends, args, realtime):
+    place_id = f"bench-clinic-{args.appointments}-{realtime}"
+    doctor = _seed_clinic(backends, place_id, args.appointments)
+    samples = []
+    for _ in range(args.runs):
+        at = backends.app(doctor, "doctor", realtime_appointments=realtime)
+        samples.append(timed(lambda: _check(at.run())))
+        if not at.metric:
+            raise RuntimeError("dashboard did not render")
+    return _latency_result(samples)
+
+
+@scenario
+def dashboard_realtime(backends, args):
+    """Doctor dashboard render from the live listener cache, with --appointments appointments."""
+    return _dashboard(backends, args, realtime=True)
+
+
+@scenario
+def dashboard_queries(backends, args):
+    """Doctor dashboard render with per-page Firestore queries, with --appointments appointments."""
+    return _dashboard(backends, args, realtime=False)
+
+
+@scenario
+def inference_throughput(backends, args):
+    """Rows scored per second by one vectorized predict_proba call over random symptom sets."""
+    symptoms = inference.read_symptoms()
+    predictor = inference.SymptomPredictor(load_benchmark_model(), symptoms)
+    rng = random.Random(0)
+    matrix = predictor.encode_many([rng.sample(symptoms, rng.randint(1, 6)) for _ in range(args.rows)])
+    elapsed = min(timed(lambda: predictor.predict_matrix(matrix)) for _ in range(3))
+    return {"unit": "rows/s", "median": args.rows / elapsed}
+
+
+def _regressed(result, baseline, tolerance):
+    if result["unit"] == "rows/s":
+        return result["median"] < baseline["median"] / (1 + tolerance)
+    # Small absolute slack so sub-millisecond scenarios do not flap
+    return result["median"] > baseline["median"] * (1 + tolerance) + 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per external call.")
+    parser.add_argument("--runs", type=int, default=5, help="Samples per latency scenario.")
+    parser.add_argument("--appointments", type=int, default=1000, help="Appointments in the dashboard clinic.")
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows for the inference throughput scenario.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging.")
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios.")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE_PATH}.")
+    args = parser.parse_args()
+
+    if not os.path.exists(inference.MODEL_PATH):
+        stand_in = os.path.join(tempfile.mkdtemp(), "model.pkl")
+        joblib.dump(load_benchmark_model(), stand_in)
+        inference.MODEL_PATH = stand_in
+
+    backends = Backends(args.latency)
+    settings = {"latency": args.latency, "runs": args.runs, "appointments": args.appointments, "rows": args.rows}
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline = stored["results"]
+        if stored["settings"] != settings:
+            print(f"Note: the baseline was recorded with different settings: {stored['settings']}")
+
+    results = {}
+    regressions = []
+    print(f"{'scenario':<22}{'median':>14}{'p95':>12}{'baseline':>14}  ")
+    for fn in SCENARIOS:
+        if args.only and fn.__name__ not in args.only:
+            continue
+        result = results[fn.__name__] = fn(backends, args)
+        previous = baseline.get(fn.__name__)
+        flag = ""
+        if previous and _regressed(result, previous, args.tolerance):
+            flag = "REGRESSED"
+            regressions.append(fn.__name__)
+        p95 = f"{result['p95']:.1f}" if "p95" in result else "-"
+        base = f"{previous['median']:.1f}" if previous else "-"
+        print(f"{fn.__name__:<22}{result['median']:>10.1f} {result['unit']:<4}{p95:>11}{base:>14}  {flag}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            rounded = {name: {key: round(value, 1) if isinstance(value, float) else value
+                              for key, value in result.items()} for name, result in results.items()}
+            json.dump({"settings": settings, "results": rounded}, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_PATH}")
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Local geospatial index of known clinics, so nearby searches can skip Places.
+
+Clinics enter the index from Places text-search results (tagged with the
+specialist that was searched for) and from the doctor signup flow. Each row keeps
+the clinic's coordinates, a geohash of them, its specialties and, once fetched,
+its place details. `nearby()` answers "specialists of this kind within r km" with a
+geohash prefix scan plus an exact distance check, in milliseconds.
+
+Like the search cache, the index is a SQLite file in WAL mode that every worker
+process on the host shares.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import tracing
+from places import fetch_place_details
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Stored geohashes are this long (about 5 m); queries use a shorter prefix sized to the radius.
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def geohash(lat, lng, precision=GEOHASH_PRECISION):
+    """Standard base-32 geohash of a coordinate."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            interval[0] = middle
+        else:
+            value = value * 2
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) in degrees of a geohash cell with `precision` characters."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(lat, lng, radius_km):
+    """Geohash prefixes whose cells together cover the circle of `radius_km` around (lat, lng).
+
+    Uses the longest prefix whose cells are at least as large as the radius, so the
+    3 x 3 grid of points spaced one radius apart hits every cell the circle touches.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    precision = 1
+    while precision < GEOHASH_PRECISION:
+        height, width = _cell_size(precision + 1)
+        if height < dlat or width < dlng:
+            break
+        precision += 1
+    return sorted({geohash(max(-90.0, min(90.0, lat + i * dlat)), (lng + j * dlng + 180) % 360 - 180, precision)
+                   for i in (-1, 0, 1) for j in (-1, 0, 1)})
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class ClinicIndex:
+    """SQLite-backed geohash index of clinics by specialty.
+
+    `lookup()` searches within `radius_km` of the given point. Clinics seen in search
+    results are served for `max_age` seconds after they were last seen; registered
+    clinics (from doctor signup) do not expire. Stored place details are served for
+    `details_ttl` seconds, since they include opening hours.
+    """
+
+    def __init__(self, path, radius_km=10.0, max_age=30 * 24 * 60 * 60, details_ttl=60 * 60):
+        self.path = path
+        self.radius_km = radius_km
+        self.max_age = max_age
+        self.details_ttl = details_ttl
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clinics (
+                    place_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    address TEXT,
+                    lat REAL NOT NULL,
+                    lng REAL NOT NULL,
+                    geohash TEXT NOT NULL,
+                    registered INTEGER NOT NULL DEFAULT 0,
+                    details TEXT,
+                    details_at REAL,
+                    updated_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS clinics_geohash ON clinics (geohash)")
+            conn.execute("CREATE INDEX IF NOT EXISTS clinics_registered ON clinics (registered, geohash)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clinic_specialties (
+                    specialty TEXT NOT NULL,
+                    place_id TEXT NOT NULL,
+                    PRIMARY KEY (specialty, place_id)
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS clinic_specialties_place ON clinic_specialties (place_id)")
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads, so keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _upsert(self, conn, place, specialty, registered, now):
+        location = place.get('geometry', {}).get('location')
+        if not place.get('place_id') or not location:
+            return False
+        conn.execute("""
+            INSERT INTO clinics (place_id, name, address, lat, lng, geohash, registered, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (place_id) DO UPDATE SET
+                name = excluded.name, address = excluded.address, lat = excluded.lat, lng = excluded.lng,
+                geohash = excluded.geohash, registered = MAX(registered, excluded.registered),
+                updated_at = excluded.updated_at""",
+                     (place['place_id'], place.get('name'), place.get('formatted_address'), location['lat'],
+                      location['lng'], geohash(location['lat'], location['lng']), int(registered), now))
+        if specialty:
+            conn.execute("INSERT OR IGNORE INTO clinic_specialties (specialty, place_id) VALUES (?, ?)",
+                         (specialty, place['place_id']))
+        return True
+
+    def add(self, place, specialty=None, registered=False):
+        """Adds or refreshes one clinic, given as a Places result (place_id, name, address, geometry)."""
+        with self._connection() as conn:
+            return self._upsert(conn, place, specialty, registered, time.time())
+
+    def add_search_results(self, specialty, results):
+        """Adds or refreshes every result of a Places text search for `specialty`. Returns how many were indexed."""
+        now = time.time()
+        with self._connection() as conn:
+            return sum(self._upsert(conn, place, specialty, False, now) for place in results)
+
+    def set_details(self, details_by_place):
+        """Stores place details ({place_id: details}) for clinics already in the index."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany("UPDATE clinics SET details = ?, details_at = ? WHERE place_id = ?",
+                             [(json.dumps(details), now, place_id) for place_id, details in details_by_place.items()])
+
+    def __contains__(self, place_id):
+        with self._connection() as conn:
+            return conn.execute("SELECT 1 FROM clinics WHERE place_id = ?", (place_id,)).fetchone() is not None
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM clinics").fetchone()[0]
+
+    def nearby(self, lat, lng, specialty=None, radius_km=10.0, limit=5):
+        """Known clinics within `radius_km` of (lat, lng), nearest first, shaped like Places results.
+
+        Each result carries 'distance_km' and 'registered', and 'details' when fresh
+        details are stored. With `specialty`, only clinics found for it are returned,
+        plus registered clinics whose specialty is unknown (doctors who signed up
+        before it was asked for), which are marked 'unclassified'. `limit=None`
+        returns every clinic in range.
+        """
+        now = time.time()
+        cells = covering_cells(lat, lng, radius_km)
+        # '{' sorts right after 'z', the last geohash character, so [cell, cell + '{') is a prefix scan
+        cell_filter = " OR ".join(["(c.geohash >= ? AND c.geohash < ?)"] * len(cells))
+        params = [bound for cell in cells for bound in (cell, cell + "{")]
+        columns = "c.place_id, c.name, c.address, c.lat, c.lng, c.registered, c.details, c.details_at"
+        if specialty:
+            sql = f"""
+                SELECT {columns}, 0 FROM clinics c
+                JOIN clinic_specialties s ON s.place_id = c.place_id AND s.specialty = ?
+                WHERE (c.registered = 1 OR c.updated_at >= ?) AND ({cell_filter})
+                UNION ALL
+                SELECT {columns}, 1 FROM clinics c
+                WHERE c.registered = 1 AND ({cell_filter})
+                    AND NOT EXISTS (SELECT 1 FROM clinic_specialties s WHERE s.place_id = c.place_id)"""
+            params = [specialty, now - self.max_age] + params + params
+        else:
+            sql = f"""
+                SELECT {columns}, 0 FROM clinics c
+                WHERE (c.registered = 1 OR c.updated_at >= ?) AND ({cell_filter})"""
+            params = [now - self.max_age] + params
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        found = []
+        for place_id, name, address, clinic_lat, clinic_lng, registered, details, details_at, unclassified in rows:
+            distance = distance_km(lat, lng, clinic_lat, clinic_lng)
+            if distance > radius_km:
+                continue
+            place = {'place_id': place_id, 'name': name, 'formatted_address': address,
+                     'geometry': {'location': {'lat': clinic_lat, 'lng': clinic_lng}},
+                     'distance_km': round(distance, 3), 'registered': bool(registered)}
+            if details and details_at >= now - self.details_ttl:
+                place['details'] = json.loads(details)
+            if unclassified:
+                place['unclassified'] = True
+            found.append(place)
+        found.sort(key=lambda place: place['distance_km'])
+        return found[:limit]
+
+    def lookup(self, lat, lng, specialty, min_results=5):
+        """`nearby()` within `radius_km` when the index covers the area well enough, else None.
+
+        Coverage counts only clinics known to practice `specialty`: the nearest
+        `min_results` of them are returned, followed by up to as many registered
+        clinics whose specialty is unknown. None means the caller should search
+        Places instead.
+        """
+        found = self.nearby(lat, lng, specialty, self.radius_km, limit=None)
+        matched = [place for place in found if not place.get('unclassified')]
+        covered = len(matched) >= min_results
+        with self._lock:
+            if covered:
+                self.hits += 1
+            else:
+                self.misses += 1
+        tracing.count("clinic_index.hits" if covered else "clinic_index.misses")
+        if not covered:
+            return None
+        return matched[:min_results] + [place for place in found if place.get('unclassified')][:min_results]
+
+    def stats(self):
+        """Returns coverage counters for `lookup()` and the number of indexed clinics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            hits, misses = self.hits, self.misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0, "size": len(self)}
+
+
+def sync_registered(index, db, gmaps):
+    """Adds every clinic in the `doctors` collection that the index does not know yet.
+
+    Coordinates come from one place-details lookup per new clinic. Profiles created
+    before doctors picked a specialty are indexed without one; `lookup()` returns
+    them alongside any specialty without counting them towards coverage. Returns
+    how many clinics were added.
+    """
+    profiles = [doc.to_dict() for doc in db.collection("doctors").stream()]
+    tracing.count("firestore.reads", max(len(profiles), 1))
+    new = [profile for profile in profiles if profile.get('place_id') and profile['place_id'] not in index]
+    details = fetch_place_details(gmaps, [profile['place_id'] for profile in new],
+                                  fields=['name', 'formatted_address', 'geometry'])
+    added = 0
+    for profile, place in zip(new, details):
+        added += index.add({**place, 'place_id': profile['place_id']}, profile.get('specialty'), registered=True)
+    return added
+
+
+def sync_registered_in_background(index, db, gmaps):
+    """Runs `sync_registered` on a daemon thread; failures are printed, not raised."""
+    def run():
+        try:
+            print(f"Indexed {sync_registered(index, db, gmaps)} registered clinics")
+        except Exception as e:
+            print(f"Indexing registered clinics failed: {e}")
+
+    thread = threading.Thread(target=run, name="clinic-sync", daemon=True)
+    thread.start()
+    return thread
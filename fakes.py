@@ -0,0 +1,556 @@
+"""Deterministic offline stand-ins for the external services used by the app."""
+import enum
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# Places the fake geocoder knows by more than one name: alias -> (locality, (lat, lng))
+GAZETTEER = {
+    "new delhi": ("New Delhi", (28.6139, 77.2090)),
+    "110001": ("New Delhi", (28.6328, 77.2197)),
+    "delhi": ("Delhi", (28.7041, 77.1025)),
+    "mumbai": ("Mumbai", (19.0760, 72.8777)),
+    "bombay": ("Mumbai", (19.0760, 72.8777)),
+    "400001": ("Mumbai", (18.9388, 72.8354)),
+    "bengaluru": ("Bengaluru", (12.9716, 77.5946)),
+    "bangalore": ("Bengaluru", (12.9716, 77.5946)),
+    "varanasi": ("Varanasi", (25.3176, 82.9739)),
+    "221002": ("Varanasi", (25.3356, 83.0076)),
+}
+
+
+class FakeMapsClient:
+    """Offline stand-in for `googlemaps.Client`.
+
+    Every call sleeps for `latency` seconds to mimic a network round trip and is
+    counted in `calls`. Results depend only on the arguments, so repeated runs
+    return the same places. Addresses in `GAZETTEER` geocode to their real city;
+    any other address is a town of its own near `base_location`.
+    """
+
+    def __init__(self, latency=0.0, results_per_query=10, base_location=(28.6139, 77.2090)):
+        self.latency = latency
+        self.results_per_query = results_per_query
+        self.base_location = base_location
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _location(self, place_id):
+        # Places found by a "<what> in <where>" search carry the center of <where> in their id
+        _, _, center = place_id.partition("@")
+        center = tuple(map(float, center.split(","))) if center else self.base_location
+        digest = int(_digest(place_id)[:8], 16)
+        lat_offset = ((digest & 0xFFFF) / 0xFFFF - 0.5) * 0.2
+        lng_offset = ((digest >> 16) / 0xFFFF - 0.5) * 0.2
+        return {"lat": center[0] + lat_offset, "lng": center[1] + lng_offset}
+
+    def _lookup(self, address):
+        """(locality, (lat, lng)) of an address, ignoring case, spacing and anything after a comma."""
+        alias = " ".join(address.split(",")[0].lower().split())
+        if alias.replace(" ", "").isdigit():
+            alias = alias.replace(" ", "")
+        if alias in GAZETTEER:
+            return GAZETTEER[alias]
+        # Any other address is a town of its own within about 50 km of base_location
+        digest = int(_digest(alias)[:8], 16)
+        return alias.title(), (self.base_location[0] + ((digest & 0xFFFF) / 0xFFFF - 0.5),
+                               self.base_location[1] + ((digest >> 16) / 0xFFFF - 0.5))
+
+    def _geocode_location(self, address):
+        return self._lookup(address)[1]
+
+    def places(self, query=None, type=None, **kwargs):
+        """Text search: returns `results_per_query` places derived from the query.
+
+        Queries of the form "<what> in <where>" return places around the geocoded <where>.
+        """
+        self._call("places")
+        center = self._geocode_location(query.rsplit(" in ", 1)[1]) if " in " in (query or "") else None
+        results = []
+        for i in range(self.results_per_query):
+            place_id = "fake_" + _digest(f"{query}|{i}")[:24]
+            if center:
+                place_id += f"@{center[0]:.5f},{center[1]:.5f}"
+            results.append({
+                "place_id": place_id,
+                "name": f"{query} #{i + 1}",
+                "formatted_address": f"{i + 1} Fake Street",
+                "geometry": {"location": self._location(place_id)},
+            })
+        return {"results": results, "status": "OK"}
+
+    def place(self, place_id, fields=None, **kwargs):
+        """Place details for a place id returned by `places`."""
+        self._call("place")
+        digest = int(_digest(place_id)[:8], 16)
+        short_id = place_id.partition("@")[0]
+        result = {
+            "name": f"Clinic {short_id[-6:]}",
+            "formatted_address": f"{short_id[-4:]} Fake Street",
+            "international_phone_number": "+91 00000 00000",
+            "website": f"https://example.com/{place_id}",
+            "rating": 4.0 + (digest % 10) / 10,
+            "opening_hours": {"open_now": digest % 2 == 0},
+            "geometry": {"location": self._location(place_id)},
+        }
+        if fields:
+            result = {key: value for key, value in result.items() if key in fields}
+        return {"result": result, "status": "OK"}
+
+    def geocode(self, address=None, **kwargs):
+        """Geocoding: one result per non-empty address, with its locality and country components."""
+        self._call("geocode")
+        if not address or not address.strip():
+            return []
+        locality, (lat, lng) = self._lookup(address)
+        alias = "".join(address.split()).lower()
+        components = [{"long_name": locality, "short_name": locality, "types": ["locality", "political"]},
+                      {"long_name": "India", "short_name": "IN", "types": ["country", "political"]}]
+        if alias.isdigit():
+            components.insert(0, {"long_name": alias, "short_name": alias, "types": ["postal_code"]})
+        return [{
+            "place_id": "fake_geo_" + _digest(alias)[:24],
+            "formatted_address": ", ".join(component["long_name"] for component in components),
+            "address_components": components,
+            "geometry": {"location": {"lat": lat, "lng": lng}},
+            "types": ["postal_code"] if alias.isdigit() else ["locality", "political"],
+        }]
+
+
+# --- Firestore ---
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: b in (a or []),
+}
+
+
+class FakeDocumentSnapshot:
+    """Immutable view of a document, like `google.cloud.firestore.DocumentSnapshot`."""
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = None if data is None else dict(data)
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    """Reference to one document in a `FakeFirestore` collection."""
+
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self._collection}/{self.id}"
+
+    def get(self, transaction=None):
+        self._db._call("read")
+        with self._db._lock:
+            if transaction is not None:
+                transaction._record_read(self.path)
+            return FakeDocumentSnapshot(self, self._db._docs(self._collection).get(self.id))
+
+    def set(self, data, merge=False):
+        self._db._call("write")
+        self._db._write(self._collection, self.id, data, merge=merge)
+
+    def update(self, data):
+        self._db._call("write")
+        with self._db._lock:
+            if self.id not in self._db._docs(self._collection):
+                raise KeyError(f"No document to update: {self.path}")
+        self._db._write(self._collection, self.id, data, merge=True)
+
+    def delete(self):
+        self._db._call("write")
+        self._db._write(self._collection, self.id, None)
+
+
+class FakeChangeType(enum.Enum):
+    ADDED = 1
+    MODIFIED = 2
+    REMOVED = 3
+
+
+class FakeDocumentChange:
+    def __init__(self, type, document):
+        self.type = type
+        self.document = document
+
+
+class FakeWatch:
+    """Handle returned by `FakeQuery.on_snapshot`."""
+
+    def __init__(self, db, query, callback):
+        self._db = db
+        self._query = query
+        self._callback = callback
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _deliver(self):
+        with self._lock:
+            self._deliver_changes()
+
+    def _deliver_changes(self):
+        current = dict(self._query._matching())
+        changes = []
+        for doc_id, data in current.items():
+            if doc_id not in self._seen:
+                changes.append((FakeChangeType.ADDED, doc_id, data))
+            elif self._seen[doc_id] != data:
+                changes.append((FakeChangeType.MODIFIED, doc_id, data))
+        for doc_id, data in self._seen.items():
+            if doc_id not in current:
+                changes.append((FakeChangeType.REMOVED, doc_id, data))
+        if changes or not self._seen:
+            self._seen = current
+            ref = self._query._db.collection(self._query._collection).document
+            snapshots = [FakeDocumentSnapshot(ref(doc_id), data) for doc_id, data in current.items()]
+            self._callback(snapshots,
+                           [FakeDocumentChange(kind, FakeDocumentSnapshot(ref(doc_id), data))
+                            for kind, doc_id, data in changes],
+                           time.time())
+
+    def unsubscribe(self):
+        with self._db._lock:
+            if self in self._db._watches:
+                self._db._watches.remove(self)
+
+
+class FakeAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregationQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self):
+        self._query._db._call("read")
+        return [[FakeAggregationResult(self._alias, len(self._query._matching()))]]
+
+
+class FakeQuery:
+    """Supports the subset of `google.cloud.firestore.Query` the app uses."""
+
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, db, collection, filters=(), orders=(), limit=None, cursor=None):
+        self._db = db
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, orders=self._orders, limit=self._limit, cursor=self._cursor)
+        state.update(changes)
+        return FakeQuery(self._db, self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, _OPERATORS[op_string], value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def count(self, alias=None):
+        return FakeAggregationQuery(self, alias)
+
+    def on_snapshot(self, callback):
+        """Calls `callback(snapshots, changes, read_time)` now and after every relevant write."""
+        watch = FakeWatch(self._db, self, callback)
+        with self._db._lock:
+            self._db._watches.append(watch)
+        self._db._call("read", count=max(len(self._matching()), 1))
+        watch._deliver()
+        return watch
+
+    def _matching(self):
+        with self._db._lock:
+            # Like Firestore, documents missing a filtered or ordered field never match.
+            docs = [(doc_id, dict(data)) for doc_id, data in self._db._docs(self._collection).items()
+                    if all(field in data and op(data[field], value) for field, op, value in self._filters)
+                    and all(field in data for field, _ in self._orders)]
+        # Sort on each order_by field in turn, then on the document id.
+        docs.sort(key=lambda item: item[0])
+        for field, direction in reversed(self._orders):
+            docs.sort(key=lambda item: item[1][field], reverse=direction == self.DESCENDING)
+        return docs
+
+    def _compare(self, row, cursor):
+        for value, bound, direction in zip(row, cursor, [d for _, d in self._orders] + [self.ASCENDING]):
+            if value != bound:
+                sign = 1 if value > bound else -1
+                return -sign if direction == self.DESCENDING else sign
+        return 0
+
+    def _after_cursor(self, docs):
+        if self._cursor is None:
+            return docs
+        if isinstance(self._cursor, FakeDocumentSnapshot):
+            data = self._cursor.to_dict() or {}
+            cursor = [data.get(field) for field, _ in self._orders] + [self._cursor.id]
+            return [(doc_id, doc) for doc_id, doc in docs
+                    if self._compare([doc[field] for field, _ in self._orders] + [doc_id], cursor) > 0]
+        cursor = [self._cursor.get(field) for field, _ in self._orders]
+        return [(doc_id, doc) for doc_id, doc in docs
+                if self._compare([doc[field] for field, _ in self._orders], cursor) > 0]
+
+    def stream(self, transaction=None):
+        docs = self._after_cursor(self._matching())
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        self._db._call("read", count=max(len(docs), 1))
+        if transaction is not None:
+            with self._db._lock:
+                for doc_id, _ in docs:
+                    transaction._record_read(f"{self._collection}/{doc_id}")
+        for doc_id, data in docs:
+            yield FakeDocumentSnapshot(FakeDocumentReference(self._db, self._collection, doc_id), data)
+
+    def get(self, transaction=None):
+        return list(self.stream(transaction))
+
+
+class FakeWriteBatch:
+    """Buffers writes and applies them all at once on `commit()`, like `WriteBatch`."""
+
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference, data, merge, False))
+
+    def update(self, reference, data):
+        self._writes.append((reference, data, True, True))
+
+    def delete(self, reference):
+        self._writes.append((reference, None, False, False))
+
+    def commit(self):
+        if len(self._writes) > 500:
+            raise ValueError("A batch can contain at most 500 writes.")
+        self._db._call("write", count=len(self._writes))
+        with self._db._lock:
+            self._apply()
+        self._writes = []
+
+    def _apply(self):
+        # Called with the database lock held: all writes land, or none do
+        for reference, _, _, must_exist in self._writes:
+            if must_exist and reference.id not in self._db._docs(reference._collection):
+                raise KeyError(f"No document to update: {reference.path}")
+        for reference, data, merge, _ in self._writes:
+            self._db._write(reference._collection, reference.id, data, merge=merge)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Stand-in for `google.cloud.firestore.Transaction`, driven by `google.cloud.firestore.transactional`.
+
+    Concurrency is optimistic: writes are buffered, and the version of every
+    document read through the transaction is recorded. If any of them has been
+    written since, the commit raises `Aborted` instead of applying the writes, so
+    `transactional` re-runs the function the way it does against Firestore.
+    """
+
+    def __init__(self, db, max_attempts=5, read_only=False):
+        super().__init__(db)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._reads = {}  # path -> version when first read
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def _begin(self, retry_id=None):
+        if self.in_progress:
+            raise ValueError("The transaction has already begun.")
+        self._id = uuid.uuid4().bytes
+
+    def _record_read(self, path):
+        # Called with the database lock held
+        self._reads.setdefault(path, self._db._versions.get(path, 0))
+
+    def _clean_up(self):
+        self._writes = []
+        self._reads = {}
+        self._id = None
+
+    def _commit(self):
+        if not self.in_progress:
+            raise ValueError("The transaction has not begun.")
+        try:
+            if self._writes:
+                if len(self._writes) > 500:
+                    raise ValueError("A batch can contain at most 500 writes.")
+                self._db._call("write", count=len(self._writes))
+                with self._db._lock:
+                    changed = [path for path, version in self._reads.items()
+                               if self._db._versions.get(path, 0) != version]
+                    if changed:
+                        from google.api_core.exceptions import Aborted
+                        raise Aborted(f"Transaction contention: {changed[0]} was written since it was read.")
+                    self._apply()
+        finally:
+            self._clean_up()
+        return []
+
+    def _rollback(self):
+        self._clean_up()
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db, name):
+        super().__init__(db, name)
+        self.id = name
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._db, self._collection, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeFirestore:
+    """In-memory stand-in for `google.cloud.firestore.Client`.
+
+    Every call sleeps for `latency` seconds. Reads and writes are counted in `calls`
+    the way Firestore bills them (a query costs one read per returned document).
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._data = {}
+        self._watches = []
+        self._versions = Counter()  # document path -> number of writes, for transaction conflicts
+        self._lock = threading.RLock()
+
+    def _call(self, kind, count=1):
+        with self._lock:
+            self.calls[kind] += count
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _docs(self, collection):
+        return self._data.setdefault(collection, {})
+
+    def _write(self, collection, doc_id, data, merge=False):
+        with self._lock:
+            docs = self._docs(collection)
+            self._versions[f"{collection}/{doc_id}"] += 1
+            if data is None:
+                docs.pop(doc_id, None)
+            elif merge and doc_id in docs:
+                docs[doc_id] = {**docs[doc_id], **data}
+            else:
+                docs[doc_id] = dict(data)
+            watches = [watch for watch in self._watches if watch._query._collection == collection]
+        for watch in watches:
+            watch._deliver()
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return FakeTransaction(self, max_attempts, read_only)
+
+
+# --- Auth ---
+
+class FakeAuth:
+    """Stand-in for the Pyrebase auth client, with accounts kept in memory."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._users = {}  # email -> (password, localId)
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _session(self, email, local_id):
+        return {"email": email, "localId": local_id, "idToken": f"token-{local_id}", "refreshToken": "refresh"}
+
+    def create_user_with_email_and_password(self, email, password):
+        self._call("create_user")
+        with self._lock:
+            if email in self._users:
+                raise ValueError("EMAIL_EXISTS")
+            local_id = _digest(email)[:28]
+            self._users[email] = (password, local_id)
+        return self._session(email, local_id)
+
+    def sign_in_with_email_and_password(self, email, password):
+        self._call("sign_in")
+        with self._lock:
+            stored = self._users.get(email)
+        if stored is None or stored[0] != password:
+            raise ValueError("INVALID_LOGIN_CREDENTIALS")
+        return self._session(email, stored[1])
+
+    def delete_user_account(self, id_token):
+        self._call("delete_user")
+        with self._lock:
+            for email, (_, local_id) in list(self._users.items()):
+                if id_token == f"token-{local_id}":
+                    del self._users[email]
@@ -0,0 +1,164 @@
+"""Flattened, memory-mappable export of the tree ensemble behind the disease predictor.
+
+A pickled scikit-learn forest is unpickled into each worker process's private
+heap. `flatten` copies the trees into a handful of plain arrays (node features,
+thresholds, child links and the class probabilities of the leaves) which `save`
+writes as .npy files. `load` memory-maps them read-only, so every worker process
+on a host shares the same page-cache pages and loading is close to free.
+
+The export is a directory:
+    meta.json           classes, feature names and array shapes
+    feature.npy         split feature per node (int32)
+    threshold.npy       split threshold per node (float64, like sklearn)
+    left.npy, right.npy child node per node; for a leaf, left is -1 - (its row in leaf_value.npy)
+    roots.npy           first node of each tree
+    leaf_value.npy      class probabilities per leaf (float64)
+
+Export the app's model with:
+    python flat_forest.py
+"""
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+ARRAYS = ["feature", "threshold", "left", "right", "roots", "leaf_value"]
+
+
+class FlatForest:
+    """Prediction-only stand-in for a fitted `DecisionTreeClassifier` or `RandomForestClassifier`.
+
+    Exposes the parts of the sklearn API the app uses: `predict`, `predict_proba`,
+    `classes_`, `n_features_in_` and (when the model had them) `feature_names_in_`.
+    Probabilities are the mean of the trees' leaf probabilities, as in sklearn.
+    Scoring one row is several times faster than sklearn's (no per-call parallel
+    dispatch); for batches of thousands of rows sklearn's compiled trees win, so
+    batch_predict.py keeps using the pickle.
+    """
+
+    def __init__(self, arrays, classes, feature_names=None, n_features=None, max_depth=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.classes_ = np.asarray(classes, dtype=object)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = n_features if n_features is not None else len(feature_names)
+        self.n_classes_ = len(self.classes_)
+        self.n_trees = len(self.roots)
+        self.max_depth = max_depth
+
+    def _leaves(self, X):
+        """Leaf row reached in each tree, as an n_rows x n_trees array."""
+        X = np.ascontiguousarray(X)
+        n_rows, n_features = X.shape
+        flat_X = X.reshape(-1)
+        nodes = np.tile(self.roots, n_rows)
+        row_offsets = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        # Walk only the (row, tree) pairs that have not reached a leaf yet
+        active = np.arange(len(nodes))
+        while len(active):
+            current = nodes[active]
+            left = self.left[current]
+            internal = left >= 0
+            active, current, left = active[internal], current[internal], left[internal]
+            go_left = flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            nodes[active] = np.where(go_left, left, self.right[current])
+        return (-1 - self.left[nodes]).reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        leaves = self._leaves(X)
+        proba = np.zeros((len(leaves), self.n_classes_))
+        for tree in range(self.n_trees):
+            proba += self.leaf_value[leaves[:, tree]]
+        return proba / self.n_trees
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+
+def flatten(model):
+    """Converts a fitted sklearn tree classifier or forest of them into a `FlatForest`."""
+    trees = [model] if hasattr(model, "tree_") else list(getattr(model, "estimators_", []))
+    if not trees or not all(hasattr(tree, "tree_") for tree in trees):
+        raise TypeError(f"cannot flatten a {type(model).__name__}; expected a tree classifier or a forest of them")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise TypeError("multi-output models are not supported")
+
+    features, thresholds, lefts, rights, roots, leaf_values = [], [], [], [], [], []
+    offset = 0
+    leaf_offset = 0
+    for tree in trees:
+        t = tree.tree_
+        is_leaf = t.children_left == -1
+        # Number each tree's leaves after those of the trees before it
+        leaf_rows = np.cumsum(is_leaf) - 1 + leaf_offset
+        values = t.value[is_leaf, 0, :]
+        leaf_values.append(values / values.sum(axis=1, keepdims=True))
+        features.append(np.where(is_leaf, 0, t.feature))
+        thresholds.append(t.threshold)
+        lefts.append(np.where(is_leaf, -1 - leaf_rows, t.children_left + offset))
+        rights.append(np.where(is_leaf, -1, t.children_right + offset))
+        roots.append(offset)
+        offset += t.node_count
+        leaf_offset += int(is_leaf.sum())
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "leaf_value": np.concatenate(leaf_values).astype(np.float64),
+    }
+    feature_names = getattr(model, "feature_names_in_", None)
+    return FlatForest(arrays, model.classes_,
+                      feature_names=None if feature_names is None else list(feature_names),
+                      n_features=model.n_features_in_,
+                      max_depth=max(tree.tree_.max_depth for tree in trees))
+
+
+def save(forest, path):
+    """Writes `forest` to the directory `path` (created if needed)."""
+    os.makedirs(path, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(forest, name)))
+    feature_names = getattr(forest, "feature_names_in_", None)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "classes": [str(c) for c in forest.classes_],
+        "feature_names": None if feature_names is None else [str(f) for f in feature_names],
+        "n_features": int(forest.n_features_in_),
+        "n_trees": int(forest.n_trees),
+        "max_depth": forest.max_depth,
+        "shapes": {name: list(getattr(forest, name).shape) for name in ARRAYS},
+    }
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+        f.write("\n")
+
+
+def exists(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def load(path, mmap_mode="r"):
+    """Loads a `FlatForest` saved by `save`; with the default `mmap_mode` the arrays are memory-mapped."""
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported flat model format {meta.get('format_version')} in {path}")
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+    return FlatForest(arrays, meta["classes"], feature_names=meta["feature_names"],
+                      n_features=meta["n_features"], max_depth=meta["max_depth"])
+
+
+if __name__ == '__main__':
+    # Export the pickled model next to it: python flat_forest.py
+    import joblib
+
+    from inference import FLAT_MODEL_PATH, MODEL_PATH
+
+    save(flatten(joblib.load(MODEL_PATH)), FLAT_MODEL_PATH)
+    print(f"Wrote {FLAT_MODEL_PATH}")
@@ -0,0 +1,205 @@
+"""Symptom encoding and memoized disease prediction."""
+import json
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import flat_forest
+from ttl_cache import TTLCache
+
+MODEL_PATH = 'model/disease_predictor_model.pkl'
+# Memory-mapped export of the same model (see flat_forest.py); preferred when present.
+FLAT_MODEL_PATH = 'model/disease_predictor_model'
+TRAINING_CSV = 'Training.csv'
+# Symptom names in model column order, so the app never has to parse Training.csv.
+MANIFEST_PATH = 'model/symptom_manifest.json'
+# Specialist for every condition the model can predict, written by train.py.
+SPECIALISTS_PATH = 'model/specialists.json'
+
+# Specialist to search for, per predicted condition. Anything not listed maps to DEFAULT_SPECIALIST.
+SPECIALTY_MAP = {
+    'Fungal infection': 'Dermatologist', 'Allergy': 'Allergist',
+    'GERD': 'Gastroenterologist',
+    'Acne': 'Dermatologist', 'Pneumonia': 'Pulmonologist',
+    'Jaundice': 'Gastroenterologist',
+    'Migraine': 'Neurologist', 'Hypertension ': 'Cardiologist',
+    'Heart attack': 'Cardiologist',
+    'Paralysis (brain hemorrhage)': 'Neurologist',
+    'Chicken pox': 'Dermatologist',
+    'Malaria': 'General Practitioner', 'Dengue': 'General Practitioner',
+    'Typhoid': 'General Practitioner'
+}
+DEFAULT_SPECIALIST = 'General Practitioner'
+SPECIALISTS = sorted(set(SPECIALTY_MAP.values()) | {DEFAULT_SPECIALIST})
+
+# Differential diagnosis: how many conditions to consider, and the least likely one worth a search
+DIFFERENTIAL_SIZE = 3
+DIFFERENTIAL_MIN_PROBABILITY = 0.1
+
+
+def load_model(path=None, flat_path=None):
+    """Loads the model, preferring its memory-mapped export (see flat_forest.py) when one exists.
+
+    Defaults to MODEL_PATH and FLAT_MODEL_PATH.
+    """
+    flat_path = flat_path or FLAT_MODEL_PATH
+    if flat_forest.exists(flat_path):
+        # Read-only mmap: every worker process on the host shares the same pages
+        return flat_forest.load(flat_path)
+    return joblib.load(path or MODEL_PATH)
+
+
+def read_symptoms(path=TRAINING_CSV):
+    """Reads the symptom names from the header of the training CSV."""
+    columns = pd.read_csv(path, nrows=0).columns
+    return [col for col in columns if col != 'prognosis' and not col.startswith('Unnamed:')]
+
+
+def write_manifest(symptoms, path=MANIFEST_PATH):
+    """Writes the symptom manifest that ships next to the model."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"symptoms": list(symptoms)}, f, indent=1)
+        f.write("\n")
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Reads the symptom names from the manifest."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)["symptoms"]
+
+
+def check_manifest(model, symptoms):
+    """Returns a description of how `symptoms` disagrees with the model's features, or None."""
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        n_features = getattr(model, "n_features_in_", len(symptoms))
+        if n_features != len(symptoms):
+            return f"the model expects {n_features} features but the manifest lists {len(symptoms)}"
+        return None
+    missing = sorted(set(feature_names) - set(symptoms))
+    unknown = sorted(set(symptoms) - set(feature_names))
+    if missing or unknown:
+        return f"symptoms missing from the manifest: {missing}; not known to the model: {unknown}"
+    return None
+
+
+def specialist_table(conditions):
+    """Maps every condition in `conditions` to its specialist."""
+    return {str(condition): get_specialist(condition) for condition in conditions}
+
+
+def write_specialists(table, path=SPECIALISTS_PATH):
+    """Writes the condition -> specialist table that ships next to the model."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"specialists": table}, f, indent=1)
+        f.write("\n")
+
+
+def load_specialists(path=SPECIALISTS_PATH):
+    """Reads the condition -> specialist table."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)["specialists"]
+
+
+def get_specialist(condition, table=None):
+    """Maps a predicted condition to the specialist to search for, preferring `table` when given."""
+    if table is not None and condition in table:
+        return table[condition]
+    return SPECIALTY_MAP.get(condition, DEFAULT_SPECIALIST)
+
+
+class SymptomPredictor:
+    """Encodes symptom selections as bitmasks and memoizes the model's predictions.
+
+    The symptom -> column index is computed once from the model's own feature
+    names (falling back to `symptoms`), so a selection is encoded without building
+    a DataFrame. Predictions are kept in an LRU keyed by the bitmask, so a repeated
+    symptom combination never reaches the model.
+    """
+
+    def __init__(self, model, symptoms, cache_size=4096):
+        self.model = model
+        feature_names = getattr(model, "feature_names_in_", None)
+        self.features = list(feature_names) if feature_names is not None else list(symptoms)
+        self.index = {symptom: i for i, symptom in enumerate(self.features)}
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf"))
+
+    def encode(self, selected):
+        """Returns the bitmask of `selected`; unknown symptoms are ignored."""
+        mask = 0
+        for symptom in selected:
+            i = self.index.get(symptom)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def to_vector(self, mask):
+        """Expands a bitmask into a 1 x n_features uint8 row for the model."""
+        n = len(self.features)
+        packed = np.frombuffer(mask.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, count=n, bitorder="little").reshape(1, n)
+
+    def _score(self, method, X):
+        """Calls `self.model.<method>(X)` with sklearn's feature-name warning silenced for this call only."""
+        # The model may have been fitted on a DataFrame; we feed it arrays laid out in the same
+        # column order, so sklearn's feature-name check has nothing useful to say.
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            return getattr(self.model, method)(X)
+
+    def predict(self, selected):
+        """Returns the predicted condition for a list of symptom names."""
+        mask = self.encode(selected)
+        prediction = self.cache.get(mask)
+        if prediction is None:
+            prediction = self._score("predict", self.to_vector(mask))[0]
+            self.cache.set(mask, prediction)
+        return prediction
+
+    def predict_top(self, selected, k=DIFFERENTIAL_SIZE, min_probability=0.0):
+        """Returns the `k` most likely conditions as `[(condition, probability), ...]`, most likely first.
+
+        Conditions below `min_probability` are left out, except the most likely one.
+        The model is scored once per symptom combination with `predict_proba`.
+        """
+        mask = self.encode(selected)
+        key = ("top", mask, k, min_probability)
+        ranked = self.cache.get(key)
+        if ranked is None:
+            if hasattr(self.model, "predict_proba"):
+                probabilities = self._score("predict_proba", self.to_vector(mask))[0]
+                best = np.argsort(probabilities)[::-1][:k]
+                ranked = [(self.model.classes_[i], float(probabilities[i])) for rank, i in enumerate(best)
+                          if rank == 0 or (probabilities[i] > 0 and probabilities[i] >= min_probability)]
+            else:
+                ranked = [(self._score("predict", self.to_vector(mask))[0], float("nan"))]
+            self.cache.set(key, ranked)
+        return ranked
+
+    def encode_many(self, selections):
+        """Encodes a sequence of symptom lists into an n_rows x n_features uint8 matrix."""
+        matrix = np.zeros((len(selections), len(self.features)), dtype=np.uint8)
+        for row, selected in enumerate(selections):
+            columns = [self.index[symptom] for symptom in selected if symptom in self.index]
+            matrix[row, columns] = 1
+        return matrix
+
+    def predict_matrix(self, matrix):
+        """Scores an encoded matrix with one vectorized call.
+
+        Returns `(conditions, confidences)`. Confidence is the top class probability,
+        or NaN when the model has no `predict_proba`.
+        """
+        if hasattr(self.model, "predict_proba"):
+            probabilities = self._score("predict_proba", matrix)
+            best = probabilities.argmax(axis=1)
+            return self.model.classes_[best], probabilities[np.arange(len(best)), best]
+        return self._score("predict", matrix), np.full(len(matrix), np.nan)
+
+
+if __name__ == '__main__':
+    # Regenerate the manifest from the training data: python inference.py
+    write_manifest(read_symptoms())
+    print(f"Wrote {MANIFEST_PATH}")
@@ -0,0 +1,106 @@
+"""Resolves the free-text location a patient types into a geocoded place.
+
+`LocationResolver` normalizes the text and geocodes it once. Each result keeps
+its own identity (the geocoder's place_id) and coordinates, so "Connaught Place"
+and "110001" stay distinct places, while spellings the geocoder maps to the same
+place share a key. Doctor searches use both levels: the clinic index and the
+results cache use the place, and the Places text query uses its region
+("New Delhi, India"), so text searches are shared across a city.
+
+Resolutions are kept in a persistent `SearchCache` (SQLite, LRU eviction) that
+every worker process on the host shares.
+"""
+import threading
+from collections import namedtuple
+
+import tracing
+from search_cache import normalize_query
+
+
+class ResolvedLocation(namedtuple("ResolvedLocation", "key name region lat lng")):
+    """A geocoded place: `key` identifies it, `name` is its address, `region` is what text searches use."""
+
+
+def _locality(result):
+    """The city a geocoding result lies in, or None if it does not say."""
+    for kind in ("locality", "postal_town", "administrative_area_level_2"):
+        for component in result.get("address_components", []):
+            if kind in component.get("types", []):
+                return component["long_name"]
+    return None
+
+
+def _country(result):
+    for component in result.get("address_components", []):
+        if "country" in component.get("types", []):
+            return component["long_name"]
+    return None
+
+
+class LocationResolver:
+    """Geocodes free-text locations through a persistent cache.
+
+    Stale entries are refreshed on use, and served anyway if Maps cannot be
+    reached. Text that Maps cannot place is cached too, as None.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, gmaps, text):
+        """Returns the `ResolvedLocation` for `text`, or None if it cannot be placed."""
+        key = normalize_query(text)
+        if not key:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] and set(cached[0]) != set(ResolvedLocation._fields):
+            cached = None  # written before the current fields; resolve it again
+        if cached is not None and cached[1]:
+            with self._lock:
+                self.hits += 1
+            tracing.count("maps.geocode_cached")
+            return ResolvedLocation(**cached[0]) if cached[0] else None
+
+        with self._lock:
+            self.misses += 1
+        tracing.count("maps.geocode")
+        try:
+            results = gmaps.geocode(text)
+        except Exception:
+            if cached is not None:
+                return ResolvedLocation(**cached[0]) if cached[0] else None
+            raise
+        resolved = self._place(results)
+        self.cache.set(key, resolved._asdict() if resolved else None)
+        return resolved
+
+    @staticmethod
+    def _place(results):
+        if not results:
+            return None
+        result = results[0]
+        name = result.get("formatted_address", "")
+        locality = _locality(result)
+        if locality is None:
+            region = name
+        else:
+            country = _country(result)
+            region = f"{locality}, {country}" if country else locality
+        point = result["geometry"]["location"]
+        return ResolvedLocation(result.get("place_id") or normalize_query(name), name, region,
+                                point["lat"], point["lng"])
+
+    def stats(self):
+        """Returns hit/miss counters; every hit is a geocoding call avoided."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "geocode_calls": self.misses,
+                "calls_avoided": self.hits,
+            }
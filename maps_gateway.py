@@ -0,0 +1,198 @@
+"""Process-wide gateway for outbound Google Maps requests.
+
+When a city or clinic trends, many sessions ask Maps the same thing at the same
+moment. `MapsGateway` wraps the Maps client so that identical requests already in
+flight are merged into one upstream call whose result (or error) every caller
+receives ("single-flight"). Upstream calls are paced by a token bucket, each
+attempt is given a timeout, and failures the caller marks as transient are
+retried a bounded number of times with jittered exponential backoff.
+
+The rate limit is per process: with several worker processes, give each its share.
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import tracing
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=None, timer=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._timer = timer
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = timer()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, blocking until one is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._timer()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class MapsGateway:
+    """Wraps a `googlemaps.Client` so `places()`, `place()` and `geocode()` are coalesced and rate limited.
+
+    `timeout` bounds each upstream attempt from the moment it starts; waiting for a
+    token or a free upstream slot is not counted against it, and is reported as
+    queueing delay instead. An attempt that overruns is abandoned and counts as a
+    failure, but Python cannot stop its thread: it keeps its upstream slot until the
+    client returns, so give the client a timeout of its own (services.py passes the
+    same one) to bound it. `stats()` reports how many abandoned attempts are still
+    running. `retry_on` lists the exception types worth retrying, besides timeouts;
+    `max_retries` bounds the extra attempts. At most `max_concurrency` upstream calls
+    run at once. Every other client method is passed through.
+    """
+
+    def __init__(self, client, rate=50.0, burst=None, timeout=10.0, max_retries=2, retry_on=(),
+                 backoff=0.2, max_concurrency=16):
+        self.client = client
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_on = (TimeoutError, *retry_on)
+        self.backoff = backoff
+        self.requests = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.abandoned = 0
+        self.errors = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="maps-gateway")
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def places(self, query=None, **kwargs):
+        """Same as `googlemaps.Client.places`."""
+        return self._request("places", query=query, **kwargs)
+
+    def place(self, place_id, **kwargs):
+        """Same as `googlemaps.Client.place`."""
+        return self._request("place", place_id=place_id, **kwargs)
+
+    def geocode(self, address=None, **kwargs):
+        """Same as `googlemaps.Client.geocode`."""
+        return self._request("geocode", address=address, **kwargs)
+
+    @staticmethod
+    def request_key(method, **kwargs):
+        """Identifies a request: the method plus its (order-independent) keyword arguments."""
+        return json.dumps([method, kwargs], sort_keys=True, default=str)
+
+    def _request(self, method, **kwargs):
+        key = self.request_key(method, **kwargs)
+        with self._lock:
+            self.requests += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            tracing.count("maps.coalesced")
+            return future.result()
+
+        try:
+            future.set_result(self._call_with_retries(method, kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def _call_with_retries(self, method, kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._attempt(method, kwargs)
+            except self.retry_on as e:
+                with self._lock:
+                    if isinstance(e, TimeoutError):
+                        self.timeouts += 1
+                    if attempt == self.max_retries:
+                        self.errors += 1
+                    else:
+                        self.retries += 1
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+
+    def _attempt(self, method, kwargs):
+        queued_at = time.monotonic()
+        self.bucket.acquire()
+        started = threading.Event()
+        started_at = []
+        state = {"finished": False, "abandoned": False}
+
+        def call():
+            started_at.append(time.monotonic())
+            started.set()
+            try:
+                return getattr(self.client, method)(**kwargs)
+            finally:
+                with self._lock:
+                    state["finished"] = True
+                    if state["abandoned"]:
+                        self.abandoned -= 1
+
+        future = self._executor.submit(call)
+        try:
+            # The timeout starts once a worker picks the call up, not while it waits for one
+            started.wait()
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                if not state["finished"]:
+                    state["abandoned"] = True
+                    self.abandoned += 1
+            raise TimeoutError(f"Maps {method} request timed out after {self.timeout}s") from None
+        finally:
+            # Time spent waiting for a token and for a free upstream slot
+            queued = (started_at[0] if started_at else time.monotonic()) - queued_at
+            with self._lock:
+                self.upstream_calls += 1
+                self.queue_seconds += queued
+                self.max_queue_seconds = max(self.max_queue_seconds, queued)
+
+    def stats(self):
+        """Returns request, coalescing, retry, abandoned-attempt and queueing-delay counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "upstream_calls": self.upstream_calls,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "abandoned_running": self.abandoned,
+                "errors": self.errors,
+                "mean_queue_ms": 1000 * self.queue_seconds / self.upstream_calls if self.upstream_calls else 0.0,
+                "max_queue_ms": 1000 * self.max_queue_seconds,
+            }
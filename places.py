@@ -0,0 +1,86 @@
+"""Google Places helpers used by the "Find a Doctor" pipeline."""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+# Fields shown on each doctor card and on the map.
+DETAIL_FIELDS = ['name', 'formatted_address', 'international_phone_number',
+                 'website', 'rating', 'opening_hours', 'geometry']
+
+# Doctors shown per specialist search.
+RESULTS_PER_SEARCH = 5
+
+# Shared by every session so the number of concurrent Maps requests stays bounded.
+MAX_DETAIL_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=MAX_DETAIL_WORKERS, thread_name_prefix="place-details")
+
+
+def details_cache_key(place_id, fields):
+    """Cache key for a details lookup: the place and the (order-independent) field set."""
+    return place_id, tuple(sorted(fields))
+
+
+def fetch_place_details(gmaps, place_ids, fields=DETAIL_FIELDS, cache=None):
+    """Returns the details dict of each place in `place_ids`, in the same order.
+
+    Cached entries are served from `cache`; the remaining lookups run concurrently
+    on the shared worker pool. Errors from the Maps client are re-raised.
+    """
+    details = {}
+    missing = []
+    for place_id in dict.fromkeys(place_ids):
+        cached = cache.get(details_cache_key(place_id, fields)) if cache is not None else None
+        if cached is not None:
+            details[place_id] = cached
+        else:
+            missing.append(place_id)
+
+    tracing.count("maps.place", len(missing))
+    tracing.count("maps.place_cached", len(details))
+    futures = {place_id: _executor.submit(gmaps.place, place_id=place_id, fields=fields)
+               for place_id in missing}
+    for place_id, future in futures.items():
+        result = future.result().get('result', {})
+        details[place_id] = result
+        if cache is not None:
+            cache.set(details_cache_key(place_id, fields), result)
+
+    return [details[place_id] for place_id in place_ids]
+
+
+def search_specialists(gmaps, specialists, location, per_search=RESULTS_PER_SEARCH, index=None, center=None):
+    """Searches for several specialists near `location` at once and merges the results.
+
+    `specialists` maps each specialist to a weight, e.g. the total probability of the
+    conditions it treats. With a `ClinicIndex` and the (lat, lng) `center` of the
+    location, specialists the index covers there are answered from it (plus nearby
+    registered clinics of unknown specialty); the rest are searched on Places
+    concurrently on the shared worker pool, and what Places returns is added to the
+    index. Results are ranked by their specialist's weight, then by their position
+    in that search, and deduplicated by place_id; each keeps a 'specialties' list of
+    every search it was found by. Errors from the Maps client are re-raised.
+    """
+    ranked = sorted(specialists.items(), key=lambda item: -item[1])
+    searches = []
+    for specialist, _ in ranked:
+        found = index.lookup(*center, specialist, per_search) if index is not None and center else None
+        if found is None:
+            # Run in a copy of this context so the search is counted in the current trace
+            found = _executor.submit(contextvars.copy_context().run, gmaps.places,
+                                     query=f"{specialist} in {location}", type='doctor')
+        searches.append((specialist, found))
+
+    merged = {}
+    for specialist, found in searches:
+        if not isinstance(found, list):
+            results = found.result().get('results', [])
+            if index is not None:
+                index.add_search_results(specialist, results)
+            found = results[:per_search]
+        for place in found:
+            if place['place_id'] in merged:
+                merged[place['place_id']]['specialties'].append(specialist)
+            else:
+                merged[place['place_id']] = {**place, 'specialties': [specialist]}
+    return list(merged.values())
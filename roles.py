@@ -0,0 +1,26 @@
+"""Resolves whether a signed-in user is a doctor or a patient."""
+import tracing
+
+# Patients are cached for less time: a doctor signup handled by another worker
+# process cannot invalidate this process's cache.
+DOCTOR_TTL = 10 * 60
+PATIENT_TTL = 2 * 60
+
+
+def resolve_role(db, user_id, cache):
+    """Returns `(role, doctor_profile)` for `user_id`, reading `doctors/{user_id}` only on a cache miss.
+
+    Patients (no doctor profile) are cached too, as `("patient", None)`.
+    """
+    cached = cache.get(user_id)
+    if cached is not None:
+        return cached
+    tracing.count("firestore.reads")
+    profile = db.collection("doctors").document(user_id).get()
+    if profile.exists:
+        resolved = ("doctor", profile.to_dict())
+        cache.set(user_id, resolved, ttl=DOCTOR_TTL)
+    else:
+        resolved = ("patient", None)
+        cache.set(user_id, resolved, ttl=PATIENT_TTL)
+    return resolved
@@ -0,0 +1,174 @@
+"""Persistent cache for Places text searches, shared by every worker process on the host."""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+_ZIP_RE = re.compile(r"\b(\d{3})\s(\d{3})\b|\b(\d{5})-\d{4}\b")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Canonical form of a free-text search so trivially different inputs share a cache entry.
+
+    Lower-cases, drops punctuation and collapses whitespace. Zip codes are
+    canonicalized too: "221 002" becomes "221002" and "12345-6789" becomes "12345".
+    """
+    query = _ZIP_RE.sub(lambda m: m.group(3) or m.group(1) + m.group(2), query or "")
+    query = _PUNCT_RE.sub(" ", query.lower())
+    return _SPACE_RE.sub(" ", query).strip()
+
+
+class SearchCache:
+    """SQLite-backed key/value store with a freshness TTL, a stale window and LRU eviction.
+
+    Entries younger than `ttl` seconds are fresh. Entries older than that but
+    younger than `ttl + stale_ttl` may still be served while they are refreshed.
+    Once more than `max_entries` are stored, the least recently read are evicted.
+    The database runs in WAL mode so several processes can share one file.
+    """
+
+    def __init__(self, path, ttl=24 * 60 * 60, stale_ttl=7 * 24 * 60 * 60, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed_at)")
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads, so keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Returns `(value, is_fresh)`, or `None` if the key is missing or past its stale window."""
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT value, created_at FROM search_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            age = now - created_at
+            if age > self.ttl + self.stale_ttl:
+                conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value), age <= self.ttl
+
+    def set(self, key, value):
+        """Stores `value` (JSON-serializable) and evicts the least recently read entries if needed."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now))
+            conn.execute("""
+                DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entries,))
+
+    def invalidate(self, key):
+        """Drops `key` from the cache if present."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+
+class CachedMapsClient:
+    """Wraps a `googlemaps.Client` so `places()` text searches go through a `SearchCache`.
+
+    Fresh entries are returned directly; stale ones are returned immediately and
+    refreshed on a background thread. Every other client method is passed through.
+    """
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @staticmethod
+    def cache_key(query, **kwargs):
+        """Cache key for a text search: the normalized query plus any other request parameters."""
+        params = {key: value for key, value in kwargs.items() if value is not None}
+        return json.dumps([normalize_query(query), params], sort_keys=True, default=str)
+
+    def places(self, query=None, **kwargs):
+        """Same as `googlemaps.Client.places`, served from the cache when possible."""
+        key = self.cache_key(query, **kwargs)
+        cached = self.cache.get(key)
+        if cached is None:
+            with self._lock:
+                self.misses += 1
+            return self._fetch(key, query, kwargs)
+
+        value, is_fresh = cached
+        tracing.count("maps.places_cached")
+        with self._lock:
+            if is_fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._refresher.submit(self._refresh, key, query, kwargs)
+        return value
+
+    def _fetch(self, key, query, kwargs):
+        tracing.count("maps.places")
+        result = self.client.places(query=query, **kwargs)
+        self.cache.set(key, result)
+        return result
+
+    def _refresh(self, key, query, kwargs):
+        try:
+            self._fetch(key, query, kwargs)
+        except Exception as e:
+            print(f"Background refresh of '{query}' failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        """Returns hit/miss counters for the text-search cache."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,105 @@
+"""Compact, shareable results of a "Find a Doctor" search.
+
+The raw Places results (each with its nested details payload) are reduced to one
+`DoctorResult` per doctor holding only the fields the results panel renders, and
+the map frame is built once per search. A `SearchResults` is immutable, so the
+same object can be kept in a process-wide cache and referenced from the session
+state of every session that ran the same search.
+"""
+import sys
+
+import pandas as pd
+
+from locations import ResolvedLocation
+from search_cache import normalize_query
+
+
+class DoctorResult:
+    """One doctor card. `open_now` is None when the opening hours are unknown."""
+
+    __slots__ = ("place_id", "name", "address", "phone", "website", "rating", "open_now", "lat", "lng",
+                 "specialties")
+
+    def __init__(self, place_id, name, address, phone, website, rating, open_now, lat, lng, specialties):
+        self.place_id = place_id
+        self.name = name
+        self.address = address
+        self.phone = phone
+        self.website = website
+        self.rating = rating
+        self.open_now = open_now
+        self.lat = lat
+        self.lng = lng
+        self.specialties = specialties
+
+    @classmethod
+    def from_place(cls, place, details):
+        """Builds the record from a search result and its place details."""
+        location = details.get('geometry', {}).get('location', {})
+        opening_hours = details.get('opening_hours')
+        return cls(
+            place_id=place['place_id'],
+            name=details.get('name', 'N/A'),
+            address=details.get('formatted_address', 'Address not available'),
+            phone=details.get('international_phone_number', 'Phone not available'),
+            website=details.get('website'),
+            rating=details.get('rating', 'N/A'),
+            open_now=None if opening_hours is None else bool(opening_hours.get('open_now', False)),
+            lat=location.get('lat'),
+            lng=location.get('lng'),
+            specialties=tuple(place.get('specialties', ())),
+        )
+
+    def __repr__(self):
+        return f"DoctorResult({self.place_id!r}, {self.name!r})"
+
+
+class SearchResults:
+    """The doctors found by one search, in display order, and their map frame (None if none is located)."""
+
+    __slots__ = ("doctors", "map_data")
+
+    def __init__(self, doctors):
+        self.doctors = tuple(doctors)
+        located = [doctor for doctor in self.doctors if doctor.lat is not None]
+        self.map_data = pd.DataFrame({
+            'name': [doctor.name for doctor in located],
+            'lat': [doctor.lat for doctor in located],
+            'lon': [doctor.lng for doctor in located],
+        }) if located else None
+
+    @classmethod
+    def from_places(cls, places, details_by_place):
+        """Builds the results from merged search results and their details ({place_id: details})."""
+        return cls(DoctorResult.from_place(place, place.get('details') or details_by_place.get(place['place_id'], {}))
+                   for place in places)
+
+    def __len__(self):
+        return len(self.doctors)
+
+
+def results_key(location, weights):
+    """Cache key of a search: the location and the weighted specialists, in order.
+
+    `location` is a `ResolvedLocation`, keyed on its place, or the raw text when it could not be resolved.
+    """
+    place = ("place", location.key) if isinstance(location, ResolvedLocation) else ("text", normalize_query(location))
+    return place, tuple((specialist, round(weight, 6)) for specialist, weight in weights.items())
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes held by `obj` and everything it references (DataFrames by their own accounting)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    return size
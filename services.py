@@ -0,0 +1,163 @@
+"""External service clients, created on first use.
+
+Importing googlemaps, firebase_admin and pyrebase and building their clients is
+slow, and the login page needs none of them, so nothing here runs at import
+time. Each `get_*` function builds its client once per process and returns it,
+or shows an error and returns None if it cannot be initialized (the next call
+tries again). `use_backends()` swaps in other clients, such as the offline fakes.
+"""
+import os
+
+import streamlit as st
+
+from clinic_index import ClinicIndex
+from locations import LocationResolver
+from maps_gateway import MapsGateway
+from search_cache import CachedMapsClient, SearchCache
+
+
+# Clients installed with use_backends(), used instead of the real services
+_overrides = {}
+
+
+def use_backends(gmaps=None, db=None, auth=None):
+    """Makes get_gmaps/get_db/get_auth return the given objects, e.g. the stand-ins in fakes.py."""
+    for name, client in (("gmaps", gmaps), ("db", db), ("auth", auth)):
+        if client is not None:
+            _overrides[name] = client
+
+
+@st.cache_resource
+def get_search_cache():
+    """On-disk cache of Places text searches, shared by every session and worker process."""
+    config = dict(st.secrets.get("search_cache", {}))
+    return SearchCache(
+        config.get("path", ".cache/places_search.sqlite3"),
+        ttl=config.get("ttl_seconds", 24 * 60 * 60),
+        stale_ttl=config.get("stale_ttl_seconds", 7 * 24 * 60 * 60),
+        max_entries=config.get("max_entries", 5000),
+    )
+
+
+@st.cache_resource
+def get_clinic_index():
+    """On-disk geospatial index of known clinics, or None when the [clinic_index] secrets disable it."""
+    config = dict(st.secrets.get("clinic_index", {}))
+    if not config.get("enabled", True):
+        return None
+    return ClinicIndex(
+        config.get("path", ".cache/clinic_index.sqlite3"),
+        radius_km=config.get("radius_km", 10.0),
+        max_age=config.get("max_age_seconds", 30 * 24 * 60 * 60),
+        details_ttl=config.get("details_ttl_seconds", 60 * 60),
+    )
+
+
+@st.cache_resource
+def get_location_resolver():
+    """Resolves free-text locations to canonical places through an on-disk cache shared by every worker."""
+    config = dict(st.secrets.get("location_cache", {}))
+    return LocationResolver(SearchCache(
+        config.get("path", ".cache/locations.sqlite3"),
+        ttl=config.get("ttl_seconds", 30 * 24 * 60 * 60),
+        stale_ttl=config.get("stale_ttl_seconds", 90 * 24 * 60 * 60),
+        max_entries=config.get("max_entries", 20000),
+    ))
+
+
+@st.cache_resource(show_spinner=False)
+def _create_gmaps():
+    import googlemaps
+    from googlemaps.exceptions import Timeout, TransportError
+
+    # Identical in-flight requests from every session share one call, within a rate limit
+    config = dict(st.secrets.get("maps_gateway", {}))
+    timeout = config.get("timeout_seconds", 10.0)
+    gateway = MapsGateway(
+        # Keep the client's own retrying within one gateway attempt
+        googlemaps.Client(key=st.secrets["GOOGLE_API_KEY"], timeout=timeout, retry_timeout=timeout),
+        rate=config.get("rate_per_second", 50.0),
+        burst=config.get("burst", None),
+        timeout=timeout,
+        max_retries=config.get("max_retries", 2),
+        retry_on=(Timeout, TransportError),
+        max_concurrency=config.get("max_concurrency", 16),
+    )
+    # Text searches are served from the shared cache when possible
+    return CachedMapsClient(gateway, get_search_cache())
+
+
+@st.cache_resource(show_spinner=False)
+def _create_db():
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        # Local Firestore emulator: no service account needed
+        from google.cloud import firestore as cloud_firestore
+        print(f"Using the Firestore emulator at {os.environ['FIRESTORE_EMULATOR_HOST']}.")
+        return cloud_firestore.Client(project=os.environ.get("GCLOUD_PROJECT", "demo-health-navigator"))
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    # Check if app is already initialized
+    if not firebase_admin._apps:
+        # Use the secrets to create a credentials dictionary
+        cred_dict = dict(st.secrets["firebase_service_account"])
+        cred = credentials.Certificate(cred_dict)
+        firebase_admin.initialize_app(cred)
+
+    db = firestore.client()
+    print("Firestore client initialized.")
+    return db
+
+
+@st.cache_resource(show_spinner=False)
+def _create_auth():
+    import pyrebase
+
+    firebase_config = dict(st.secrets["firebase_config"])
+    firebase = pyrebase.initialize_app(firebase_config)
+    auth = firebase.auth()
+    print("Firebase Auth initialized.")
+    return auth
+
+
+def get_gmaps():
+    """Google Maps client (for doctor search)."""
+    if "gmaps" in _overrides:
+        return _overrides["gmaps"]
+    try:
+        return _create_gmaps()
+    except Exception as e:
+        st.error(f"Could not initialize Google Maps: {e}. Check your API key.")
+        return None
+
+
+def get_db():
+    """Firestore client (for database)."""
+    if "db" in _overrides:
+        return _overrides["db"]
+    try:
+        return _create_db()
+    except Exception as e:
+        st.error(f"Could not initialize Firestore Admin: {e}. Check your service_account keys.")
+        return None
+
+
+def get_auth():
+    """Pyrebase auth client (for login and signup)."""
+    if "auth" in _overrides:
+        return _overrides["auth"]
+    try:
+        return _create_auth()
+    except Exception as e:
+        st.error(f"Could not initialize Firebase Auth: {e}. Check your firebase_config keys.")
+        return None
+
+
+# HEALTH_NAV_BACKEND=fake runs the whole app offline against the stand-ins in fakes.py,
+# each call delayed by HEALTH_NAV_FAKE_LATENCY seconds.
+if os.environ.get("HEALTH_NAV_BACKEND") == "fake":
+    from fakes import FakeAuth, FakeFirestore, FakeMapsClient
+
+    _latency = float(os.environ.get("HEALTH_NAV_FAKE_LATENCY", "0"))
+    use_backends(gmaps=MapsGateway(FakeMapsClient(_latency)), db=FakeFirestore(_latency), auth=FakeAuth(_latency))
@@ -0,0 +1,120 @@
+"""Per-clinic, per-day slot occupancy, and booking that claims a slot atomically.
+
+Each clinic's day is one document in the `slots` collection, with id
+"<doctor_place_id>_<YYYY-MM-DD>":
+
+    {"doctor_place_id": ..., "date": "2026-11-03", "taken": {"09:30": "<appointment id>", ...}}
+
+so a day's availability is a single document read, however many appointments the
+clinic has. `book_slot` reads that document, checks the slot and creates the
+appointment in one transaction, so two patients can never be given the same
+slot; the loser gets `SlotTaken`. Declining an appointment releases its slot.
+
+The transactions use `google.cloud.firestore.transactional`, which works the
+same against Firestore, the emulator and `fakes.FakeFirestore`.
+"""
+import datetime
+
+import tracing
+
+# Bookable slots: every SLOT_MINUTES from OPENING_TIME until CLOSING_TIME
+OPENING_TIME = datetime.time(9, 0)
+CLOSING_TIME = datetime.time(17, 0)
+SLOT_MINUTES = 30
+
+
+class SlotTaken(Exception):
+    """The requested slot was claimed by another booking first."""
+
+
+def day_slots(opening=OPENING_TIME, closing=CLOSING_TIME, minutes=SLOT_MINUTES):
+    """Start times ("HH:MM") of every slot in a day."""
+    start = datetime.datetime.combine(datetime.date.min, opening)
+    end = datetime.datetime.combine(datetime.date.min, closing)
+    slots = []
+    while start + datetime.timedelta(minutes=minutes) <= end:
+        slots.append(start.strftime("%H:%M"))
+        start += datetime.timedelta(minutes=minutes)
+    return slots
+
+
+SLOTS = day_slots()
+
+
+def slots_document(db, place_id, date):
+    """Reference to the occupancy document of one clinic on one day."""
+    return db.collection("slots").document(f"{place_id}_{date}")
+
+
+def _taken(snapshot):
+    return dict((snapshot.to_dict() or {}).get("taken", {})) if snapshot.exists else {}
+
+
+def free_slots(db, place_id, date, now=None):
+    """Start times still bookable at a clinic on `date`, in order; slots already past today are left out."""
+    taken = _taken(slots_document(db, place_id, date).get())
+    tracing.count("firestore.reads")
+    now = now or datetime.datetime.now()
+    earliest = now.strftime("%H:%M") if str(date) == now.date().isoformat() else ""
+    return [slot for slot in SLOTS if slot not in taken and slot > earliest]
+
+
+def book_slot(db, place_id, date, slot, appointment):
+    """Claims `slot` at a clinic on `date` and creates the appointment, in one transaction.
+
+    `appointment` holds the remaining appointment fields (patient and doctor names,
+    status, ...); the clinic, date and time are filled in from the slot. Returns the
+    new appointment's id, or raises `SlotTaken` if the slot is no longer free.
+    """
+    from google.cloud.firestore import transactional
+
+    if slot not in SLOTS:
+        raise ValueError(f"{slot} is not a bookable slot")
+    date = str(date)
+    slots_ref = slots_document(db, place_id, date)
+    appointment_ref = db.collection("appointments").document()
+
+    @transactional
+    def claim(transaction):
+        taken = _taken(slots_ref.get(transaction=transaction))
+        if slot in taken:
+            raise SlotTaken(f"The {slot} slot on {date} has just been taken.")
+        taken[slot] = appointment_ref.id
+        transaction.set(slots_ref, {"doctor_place_id": place_id, "date": date, "taken": taken})
+        transaction.set(appointment_ref, {**appointment, "doctor_place_id": place_id,
+                                          "appointment_date": date, "appointment_time": f"{slot}:00"})
+
+    claim(db.transaction())
+    tracing.count("firestore.reads")
+    tracing.count("firestore.writes", 2)
+    return appointment_ref.id
+
+
+def release_slots(db, appt_ids):
+    """Frees the slots held by the given appointments, e.g. once they are declined.
+
+    Reads each appointment, then updates each affected day in its own transaction.
+    Appointments booked without a slot are skipped. Returns how many slots were freed.
+    """
+    from google.cloud.firestore import transactional
+
+    days = {}
+    for appt_id in appt_ids:
+        data = db.collection("appointments").document(appt_id).get().to_dict() or {}
+        if data.get("doctor_place_id") and data.get("appointment_date"):
+            days.setdefault((data["doctor_place_id"], data["appointment_date"]), set()).add(appt_id)
+    tracing.count("firestore.reads", len(appt_ids))
+
+    @transactional
+    def release(transaction, slots_ref, released_ids):
+        taken = _taken(slots_ref.get(transaction=transaction))
+        kept = {slot: appt_id for slot, appt_id in taken.items() if appt_id not in released_ids}
+        if len(kept) < len(taken):
+            transaction.update(slots_ref, {"taken": kept})
+        return len(taken) - len(kept)
+
+    freed = 0
+    for (place_id, date), released_ids in days.items():
+        freed += release(db.transaction(), slots_document(db, place_id, date), released_ids)
+        tracing.count("firestore.reads")
+    return freed
@@ -0,0 +1,218 @@
+"""Lightweight per-request timing spans and external-call counters.
+
+Wrap a request in `trace(name)`, its stages in `span(name)`, and record external
+calls with `count(name)`. Finished traces are appended to a file, either as one
+JSON object per line ("jsonl") or as OTLP/JSON trace requests ("otlp") that
+OpenTelemetry tooling can ingest. Tracing is off until `configure(enabled=True)`;
+while it is off, `trace` and `span` return a shared no-op context manager and
+`count` returns immediately.
+"""
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+
+_enabled = False
+_exporter = None
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoOp:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoOp()
+
+
+class Span:
+    """One timed stage of a trace."""
+
+    def __init__(self, name, parent_id, attributes):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans and counters recorded for one request."""
+
+    def __init__(self, name, attributes):
+        self.trace_id = secrets.token_hex(16)
+        self.root = Span(name, None, attributes)
+        self.spans = [self.root]
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def summary(self):
+        """Plain-data breakdown of the trace, for logs and the debug panel."""
+        return {
+            "trace": self.root.name,
+            "trace_id": self.trace_id,
+            "duration_ms": round(self.root.duration_ms, 2),
+            "spans": [{"name": span.name, "duration_ms": round(span.duration_ms, 2),
+                       "parent": None if span.parent_id is None else
+                       next(s.name for s in self.spans if s.span_id == span.parent_id)}
+                      for span in self.spans[1:]],
+            "counters": dict(self.counters),
+        }
+
+
+class _TraceContext:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.trace = Trace(self.name, self.attributes)
+        self._trace_token = _current_trace.set(self.trace)
+        self._span_token = _current_span.set(self.trace.root)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.root.end_ns = time.time_ns()
+        _current_span.reset(self._span_token)
+        _current_trace.reset(self._trace_token)
+        # Streamlit's rerun/stop signals derive from BaseException and are not errors
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.trace.root.attributes["error"] = exc_type.__name__
+        if _exporter is not None:
+            _exporter.export(self.trace)
+        return False
+
+
+class _SpanContext:
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.span = Span(self.name, parent.span_id if parent else None, self.attributes)
+        with self.trace._lock:
+            self.trace.spans.append(self.span)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        return False
+
+
+def configure(enabled=True, path="traces/traces.jsonl", format="jsonl"):
+    """Turns tracing on or off for the whole process and picks the export file and format."""
+    global _enabled, _exporter
+    _enabled = enabled
+    if not enabled or not path:
+        _exporter = None
+    elif format == "otlp":
+        _exporter = OtlpJsonExporter(path)
+    else:
+        _exporter = JsonlExporter(path)
+
+
+def is_enabled():
+    return _enabled
+
+
+def trace(name, **attributes):
+    """Context manager that records one request; yields the `Trace` (or None when disabled)."""
+    if not _enabled:
+        return _NOOP
+    return _TraceContext(name, attributes)
+
+
+def span(name, **attributes):
+    """Context manager that times one stage of the current trace."""
+    if not _enabled:
+        return _NOOP
+    current = _current_trace.get()
+    if current is None:
+        return _NOOP
+    return _SpanContext(current, name, attributes)
+
+
+def count(name, n=1):
+    """Adds `n` to a counter of the current trace, e.g. count("firestore.reads", 20)."""
+    if not _enabled:
+        return
+    current = _current_trace.get()
+    if current is not None:
+        with current._lock:
+            current.counters[name] = current.counters.get(name, 0) + n
+
+
+class _FileExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, finished):
+        line = json.dumps(self.encode(finished))
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class JsonlExporter(_FileExporter):
+    """Appends each trace's summary as one JSON line."""
+
+    def encode(self, finished):
+        return {"timestamp": finished.root.start_ns / 1e9, **finished.summary()}
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpJsonExporter(_FileExporter):
+    """Appends each trace as an OTLP/JSON ExportTraceServiceRequest, one per line.
+
+    This is the format of the OpenTelemetry Collector's file exporter, so the file
+    can be replayed into any OTLP-compatible backend. Counters become attributes of
+    the root span.
+    """
+
+    def encode(self, finished):
+        spans = []
+        for span in finished.spans:
+            attributes = dict(span.attributes)
+            if span is finished.root:
+                attributes.update({f"count.{name}": value for name, value in finished.counters.items()})
+            spans.append({
+                "traceId": finished.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "health-navigator"}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]}
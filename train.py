@@ -0,0 +1,196 @@
+"""Trains the disease predictor on Training.csv and exports every artifact the app loads.
+
+Each run writes a versioned directory, model/versions/<version>/, containing
+    disease_predictor_model.pkl   the fitted RandomForestClassifier
+    disease_predictor_model/      its memory-mapped export (see flat_forest.py)
+    symptom_manifest.json         symptom names in model column order
+    specialists.json              specialist for every condition the model predicts
+    training_report.json          timings, peak memory, sizes and the exact inputs
+
+The version is a hash of the training data, the parameters and the scikit-learn
+version, and the forest is seeded, so rerunning on the same inputs reproduces the
+same version (and reuses it unless --force is given). --promote copies a version
+to the paths the app reads (model/disease_predictor_model.pkl and friends).
+
+The CSV is read in chunks with uint8 symptom columns (pandas would default to
+int64, 8x the memory) and the trailing empty "Unnamed:" column is dropped.
+
+Usage:
+    python train.py --promote
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+
+import flat_forest
+from inference import (FLAT_MODEL_PATH, MANIFEST_PATH, MODEL_PATH, SPECIALISTS_PATH, TRAINING_CSV, read_symptoms,
+                       specialist_table, write_manifest, write_specialists)
+
+VERSIONS_DIR = 'model/versions'
+REPORT_FILE = 'training_report.json'
+# Parameters of the model the app originally shipped with
+DEFAULT_PARAMS = {"n_estimators": 100, "random_state": 0}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_training_data(path=TRAINING_CSV, chunk_size=1000, as_sparse=False):
+    """Reads the training CSV in chunks into a uint8 (or sparse CSR) matrix.
+
+    Returns `(X, labels, symptoms)`.
+    """
+    symptoms = read_symptoms(path)
+    dtypes = {symptom: np.uint8 for symptom in symptoms}
+    dtypes['prognosis'] = str
+    blocks, labels = [], []
+    for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=symptoms + ['prognosis'], dtype=dtypes):
+        block = chunk[symptoms].to_numpy(dtype=np.uint8)
+        blocks.append(sparse.csr_matrix(block) if as_sparse else block)
+        labels.extend(chunk['prognosis'])
+    X = sparse.vstack(blocks, format='csr') if as_sparse else np.concatenate(blocks)
+    return X, np.asarray(labels, dtype=object), symptoms
+
+
+def matrix_bytes(X):
+    if sparse.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def model_version(data_sha256, params):
+    """Deterministic id of a training run: same data, parameters and sklearn version, same id."""
+    key = json.dumps({"data": data_sha256, "params": params, "sklearn": sklearn.__version__}, sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux (and bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if platform.system() == 'Darwin' else peak / 1024
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def train(data_path=TRAINING_CSV, params=None, n_jobs=-1, chunk_size=1000, as_sparse=False,
+          versions_dir=VERSIONS_DIR, force=False):
+    """Trains and exports one version. Returns `(version_dir, report)`."""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    data_sha256 = file_sha256(data_path)
+    version = model_version(data_sha256, params)
+    version_dir = os.path.join(versions_dir, version)
+    report_path = os.path.join(version_dir, REPORT_FILE)
+    if os.path.exists(report_path) and not force:
+        with open(report_path, encoding='utf-8') as f:
+            return version_dir, json.load(f)
+
+    start = time.perf_counter()
+    X, labels, symptoms = read_training_data(data_path, chunk_size, as_sparse)
+    ingest_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(n_jobs=n_jobs, **params).fit(X, labels)
+    train_seconds = time.perf_counter() - start
+    # Fitted on a bare matrix; record the column names so the app can check its manifest
+    model.feature_names_in_ = np.asarray(symptoms, dtype=object)
+    # The app scores one row at a time, where a thread pool per call only adds overhead
+    model.set_params(n_jobs=None)
+
+    os.makedirs(version_dir, exist_ok=True)
+    model_path = os.path.join(version_dir, os.path.basename(MODEL_PATH))
+    flat_path = os.path.join(version_dir, os.path.basename(FLAT_MODEL_PATH))
+    joblib.dump(model, model_path)
+    flat_forest.save(flat_forest.flatten(model), flat_path)
+    write_manifest(symptoms, os.path.join(version_dir, os.path.basename(MANIFEST_PATH)))
+    write_specialists(specialist_table(model.classes_), os.path.join(version_dir, os.path.basename(SPECIALISTS_PATH)))
+
+    report = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "data": {"path": data_path, "sha256": data_sha256, "rows": int(X.shape[0]), "symptoms": len(symptoms),
+                 "conditions": len(model.classes_)},
+        "params": params,
+        "n_jobs": n_jobs,
+        "sklearn_version": sklearn.__version__,
+        "ingest": {"seconds": round(ingest_seconds, 3), "sparse": as_sparse, "matrix_bytes": matrix_bytes(X),
+                   "int64_matrix_bytes": int(X.shape[0] * X.shape[1] * 8)},
+        "train_seconds": round(train_seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_bytes": os.path.getsize(model_path),
+        "flat_model_bytes": directory_size(flat_path),
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+        f.write("\n")
+    return version_dir, report
+
+
+def _replace(source, destination):
+    """Copies `source` over `destination`, swapping it in with a rename so readers never see half a copy."""
+    staging = f"{destination}.new"
+    if os.path.isdir(source):
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(source, staging)
+        if os.path.exists(destination):
+            retired = f"{destination}.old"
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(destination, retired)
+            os.replace(staging, destination)
+            shutil.rmtree(retired)
+        else:
+            os.replace(staging, destination)
+    else:
+        shutil.copyfile(source, staging)
+        os.replace(staging, destination)
+
+
+def promote(version_dir):
+    """Makes `version_dir` the model the app loads."""
+    for path in (MODEL_PATH, FLAT_MODEL_PATH, MANIFEST_PATH, SPECIALISTS_PATH):
+        _replace(os.path.join(version_dir, os.path.basename(path)), path)
+    _replace(os.path.join(version_dir, REPORT_FILE), os.path.join(os.path.dirname(MODEL_PATH), REPORT_FILE))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the disease predictor and export its artifacts.")
+    parser.add_argument('--data', default=TRAINING_CSV, help="Training CSV.")
+    parser.add_argument('--n-estimators', type=int, default=DEFAULT_PARAMS["n_estimators"], help="Trees in the forest.")
+    parser.add_argument('--random-state', type=int, default=DEFAULT_PARAMS["random_state"], help="Seed of the forest.")
+    parser.add_argument('--jobs', type=int, default=-1, help="Parallel jobs for fitting (-1: all cores).")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="CSV rows read per chunk.")
+    parser.add_argument('--sparse', action='store_true', help="Hold the training matrix as sparse CSR.")
+    parser.add_argument('--force', action='store_true', help="Retrain even if this version already exists.")
+    parser.add_argument('--promote', action='store_true', help="Make this version the one the app loads.")
+    args = parser.parse_args(argv)
+
+    version_dir, report = train(args.data, {"n_estimators": args.n_estimators, "random_state": args.random_state},
+                                n_jobs=args.jobs, chunk_size=args.chunk_size, as_sparse=args.sparse,
+                                force=args.force)
+    print(json.dumps(report, indent=1))
+    print(f"Artifacts in {version_dir}")
+    if args.promote:
+        promote(version_dir)
+        print(f"Promoted version {report['version']}")
+
+
+if __name__ == '__main__':
+    main()